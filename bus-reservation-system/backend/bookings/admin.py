@@ -1,19 +1,39 @@
 from django.contrib import admin # import admin to register models and customize their display in the admin interface
-from .models import Bus, Seat, Booking # import the models
+from .models import Bus, Seat, Trip, Booking, BookingArchive, BookingEvent, WaitlistEntry # import the models
 
 # Bus model is registered and the order in which they are displayed is specified using the list_display attribute in the BusAdmin class
 class BusAdmin(admin.ModelAdmin):
-    list_display = ('bus_name', 'number', 'origin', 'destination', 'start_time', 'reach_time', 'no_of_seats', 'price')
+    list_display = ('bus_name', 'number', 'origin', 'destination', 'start_time', 'reach_time', 'no_of_seats', 'price', 'layout')
 
 # Seat model is registered and the order in which they are displayed is specified using the list_display attribute in the SeatAdmin class
 class SeatAdmin(admin.ModelAdmin):
     list_display = ('seat_number', 'bus', 'is_booked')
 
+# Trip model is registered and the order in which they are displayed is specified using the list_display attribute in the TripAdmin class
+class TripAdmin(admin.ModelAdmin):
+    list_display = ('bus', 'departure_date', 'is_archived')
+
 # Booking model is registered and the order in which they are displayed is specified using the list_display attribute in the BookingAdmin class
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ('user', 'bus', 'seat', 'booking_time', 'origin','price')
+    list_display = ('user', 'bus', 'seat', 'trip', 'booking_time', 'origin','price')
+
+# BookingArchive model is registered and the order in which they are displayed is specified using the list_display attribute in the BookingArchiveAdmin class
+class BookingArchiveAdmin(admin.ModelAdmin):
+    list_display = ('user', 'bus', 'seat', 'trip', 'booking_time', 'archived_at')
+
+# WaitlistEntry model is registered and the order in which they are displayed is specified using the list_display attribute in the WaitlistEntryAdmin class
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'bus', 'trip', 'priority', 'created_at', 'promoted_at')
+
+# BookingEvent model is registered and the order in which they are displayed is specified using the list_display attribute in the BookingEventAdmin class
+class BookingEventAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'created_at', 'processed_at', 'attempts', 'last_error')
 
 # register the models
 admin.site.register(Bus, BusAdmin)
 admin.site.register(Seat, SeatAdmin)
-admin.site.register(Booking, BookingAdmin)
\ No newline at end of file
+admin.site.register(Trip, TripAdmin)
+admin.site.register(Booking, BookingAdmin)
+admin.site.register(BookingArchive, BookingArchiveAdmin)
+admin.site.register(WaitlistEntry, WaitlistEntryAdmin)
+admin.site.register(BookingEvent, BookingEventAdmin)
\ No newline at end of file
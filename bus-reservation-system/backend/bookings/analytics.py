@@ -0,0 +1,97 @@
+from datetime import timedelta # import timedelta to compute the start of the bookings per hour window
+from decimal import Decimal # import Decimal to round revenue to cents
+
+from django.conf import settings # import settings to read how long analytics stay cached
+from django.core.cache import cache # import cache to serve dashboards polling analytics without aggregating again
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum # import aggregation helpers to count bookings and trips and sum fares in the database
+from django.db.models.functions import Coalesce, TruncHour # import Coalesce to count 0 for buses without rows and TruncHour to group bookings by hour
+from django.utils import timezone # import timezone to get the current time
+from .models import Bus, Trip, Booking, BookingArchive # import the models
+
+CACHE_TIMEOUT = getattr(settings, 'ANALYTICS_CACHE_SECONDS', 60) # seconds computed analytics are served from cache before they are computed again
+CENTS = Decimal('0.01')
+
+# create a function that returns a subquery counting rows of 'model' that belong to the bus of the outer query
+def _count_per_bus(model):
+    rows = model.objects.filter(bus=OuterRef('pk')).order_by().values('bus').annotate(count=Count('id')).values('count')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+# create a function that returns a subquery summing fares charged by bookings of 'model' that belong to the bus of the outer query
+# bookings made before fares were recorded count the price of the bus
+def _revenue_per_bus(model):
+    rows = model.objects.filter(bus=OuterRef('pk')).order_by().values('bus').annotate(revenue=Sum(Coalesce('price_paid', 'bus__price'))).values('revenue')
+    return Coalesce(Subquery(rows, output_field=DecimalField(max_digits=12, decimal_places=2)), 0, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+# create a function that returns the load factor of a number of bookings sold out of a number of seats
+def _load_factor(bookings, capacity):
+    return round(bookings / capacity, 4) if capacity else 0
+
+# create a function that computes per bus figures with a single grouped query, bookings moved to the archive are counted as well
+# seats offered by a bus are its seats times the number of trips it runs, a bus without trips sells its seats once
+def per_bus():
+    buses = Bus.objects.annotate(
+        bookings=_count_per_bus(Booking) + _count_per_bus(BookingArchive),
+        trip_count=_count_per_bus(Trip),
+        revenue=_revenue_per_bus(Booking) + _revenue_per_bus(BookingArchive),
+    ).values('id', 'number', 'bus_name', 'origin', 'destination', 'no_of_seats', 'price', 'bookings', 'trip_count', 'revenue').order_by('id')
+
+    rows = []
+    for bus in buses:
+        capacity = bus['no_of_seats'] * max(bus['trip_count'], 1)
+        rows.append({
+            **bus,
+            'revenue': Decimal(bus['revenue']).quantize(CENTS),
+            'capacity': capacity,
+            'load_factor': _load_factor(bus['bookings'], capacity),
+        })
+    return rows
+
+# create a function that rolls per bus figures up to routes
+def per_route(buses):
+    routes = {}
+    for bus in buses:
+        route = routes.setdefault((bus['origin'], bus['destination']), {
+            'origin': bus['origin'], 'destination': bus['destination'], 'buses': 0, 'capacity': 0, 'bookings': 0, 'revenue': 0,
+        })
+        route['buses'] += 1
+        route['capacity'] += bus['capacity']
+        route['bookings'] += bus['bookings']
+        route['revenue'] += bus['revenue']
+
+    for route in routes.values():
+        route['load_factor'] = _load_factor(route['bookings'], route['capacity'])
+    return list(routes.values())
+
+# create a function that counts bookings made in every hour of the last 'hours' hours, current and archived, served by the indexes on 'booking_time'
+def bookings_per_hour(hours):
+    since = timezone.now() - timedelta(hours=hours)
+    counts = {}
+    for model in (Booking, BookingArchive):
+        rows = (
+            model.objects.filter(booking_time__gte=since)
+            .annotate(hour=TruncHour('booking_time'))
+            .values('hour')
+            .annotate(bookings=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            counts[row['hour']] = counts.get(row['hour'], 0) + row['bookings']
+
+    return [{'hour': hour, 'bookings': counts[hour]} for hour in sorted(counts)]
+
+# create a function that returns all analytics, computing them at most once every 'CACHE_TIMEOUT' seconds
+def get_analytics(hours=24):
+    key = f'bookings:analytics:{hours}'
+    analytics = cache.get(key)
+
+    if analytics is None:
+        buses = per_bus()
+        analytics = {
+            'generated_at': timezone.now(),
+            'routes': per_route(buses),
+            'buses': buses,
+            'bookings_per_hour': bookings_per_hour(hours),
+        }
+        cache.set(key, analytics, CACHE_TIMEOUT)
+
+    return analytics
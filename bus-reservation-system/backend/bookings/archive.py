@@ -0,0 +1,62 @@
+from django.db import transaction # import transaction to move every batch of bookings atomically
+from .models import Booking, BookingArchive # import Booking and BookingArchive models
+
+ARCHIVED_FIELDS = ['id', 'user_id', 'bus_id', 'seat_id', 'trip_id', 'booking_time', 'price_paid'] # fields copied from a booking to the archive
+
+# create a function that moves bookings of trips that departed on or before 'cutoff' from 'Booking' to 'BookingArchive' model in batches and returns the number moved
+# every batch is copied and deleted in one transaction, so a failed run leaves every booking in exactly one table and can simply be run again
+# bookings without a trip never depart and stay in 'Booking' model
+def archive_bookings(cutoff, batch_size=1000):
+    bookings = Booking.objects.filter(trip__departure_date__lte=cutoff).order_by('id')
+    moved = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(bookings.values(*ARCHIVED_FIELDS)[:batch_size])
+            if not batch:
+                return moved
+
+            BookingArchive.objects.bulk_create([BookingArchive(**booking) for booking in batch], ignore_conflicts=True)
+            Booking.objects.filter(id__in=[booking['id'] for booking in batch]).delete()
+
+        moved += len(batch)
+
+# create a class that chains current and archived bookings of a user into one read only sequence, so history views read through the archive without knowing about it
+# current bookings come first, then archived ones, each newest first, and only the rows of the requested slice are queried
+# it supports 'count' and slicing, which is what pagination and serializers need
+class BookingHistory:
+    def __init__(self, current, archived):
+        self.current = current
+        self.archived = archived
+        self._current_count = None
+
+    def current_count(self):
+        if self._current_count is None:
+            self._current_count = self.current.count()
+        return self._current_count
+
+    def count(self):
+        return self.current_count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        yield from self.current
+        yield from self.archived
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        if index.step is not None or (index.start or 0) < 0 or (index.stop is not None and index.stop < 0):
+            raise ValueError('Only non negative slices without step are supported')
+
+        start, stop = index.start or 0, index.stop
+        split = self.current_count()
+        rows = list(self.current[start:stop]) if start < split else []
+
+        # the slice reaches past the current bookings, so continue with archived ones
+        if stop is None or stop > split:
+            rows += list(self.archived[max(start - split, 0):None if stop is None else stop - split])
+        return rows
@@ -0,0 +1,89 @@
+import threading # import threading to guard the in-process cache shared by request threads
+import time # import time to expire entries of the in-process cache
+from collections import OrderedDict # import OrderedDict to keep entries of the in-process cache in least recently used order
+
+from django.conf import settings # import settings to read size and lifetime of cached tokens
+from django.core.cache import cache # import cache to share resolved tokens between processes
+from rest_framework.authentication import TokenAuthentication # import TokenAuthentication to extend in-built token authentication
+
+LOCAL_SIZE = getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000) # maximum number of tokens kept by every process
+LOCAL_TIMEOUT = getattr(settings, 'AUTH_TOKEN_LOCAL_SECONDS', 30) # seconds a token is kept by a process, bounds how long another process can serve a token that was deleted
+SHARED_TIMEOUT = getattr(settings, 'AUTH_TOKEN_SHARED_SECONDS', 300) # seconds a token is kept in the shared cache
+
+PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache') # cache backends that keep entries in memory of every process
+
+# a cache kept in memory of every process is not shared, so a token forgotten on logout by one process stays cached by the others
+# tokens are then kept there no longer than in the in-process cache, so a deleted token can be served by another process for at most 'LOCAL_TIMEOUT' seconds
+if settings.CACHES['default']['BACKEND'] in PROCESS_CACHES:
+    SHARED_TIMEOUT = min(SHARED_TIMEOUT, LOCAL_TIMEOUT)
+
+# create a class that keeps a bounded number of entries in memory and drops the least recently used one when it is full
+class LRUCache:
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict() # key -> (expiry time, value)
+        self._lock = threading.Lock()
+
+    # return the value of a key, or None when it is missing or expired
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_local = LRUCache(LOCAL_SIZE, LOCAL_TIMEOUT) # tokens resolved by this process
+
+# create a function that returns the shared cache key of a token
+def _cache_key(key):
+    return f'bookings:token:{key}'
+
+# create a function that stores the token of a user in both caches, used after a login so that the first request is served from cache as well
+def remember_token(token, user):
+    token.user = user # keep the user with the token so that reading it from cache does not query the user
+    _local.set(token.key, token)
+    cache.set(_cache_key(token.key), token, SHARED_TIMEOUT)
+
+# create a function that drops a token from both caches, called when the token is deleted or its user changes
+def forget_token(key):
+    _local.delete(key)
+    cache.delete(_cache_key(key))
+
+# create an authentication class that inherits from 'TokenAuthentication' and resolves tokens from an in-process cache, then a shared cache, then the database
+# authenticated requests served from cache skip the 'Token' and 'User' query entirely
+# a token deleted on logout is forgotten by the process serving the logout and by the shared cache, other processes keep serving it for up to 'LOCAL_TIMEOUT' seconds
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        token = _local.get(key)
+
+        if token is None:
+            token = cache.get(_cache_key(key))
+
+            # token is not cached anywhere, so resolve it from the database, which raises 'AuthenticationFailed' for unknown keys and inactive users
+            if token is None:
+                user, token = super().authenticate_credentials(key)
+                cache.set(_cache_key(key), token, SHARED_TIMEOUT)
+
+            _local.set(key, token)
+
+        return (token.user, token)
@@ -0,0 +1,104 @@
+import time # import time to start version counters at a value that was never used before
+
+from django.core.cache import cache # import cache to keep the availability bitmap of every bus
+from .models import Seat, TripSeat # import Seat and TripSeat models to build the bitmap when it is not cached
+
+CACHE_TIMEOUT = 300 # seconds a bitmap stays cached, bounds how long a bitmap changed outside the booking engine (like from admin) can be stale
+
+VERSION_TIMEOUT = 7 * 24 * 3600 # seconds a version counter is kept, so counters created for ids of buses that do not exist go away, an expired counter starts again from the current time so old versions are not reused
+
+# create a function that returns the cache key of the availability bitmap of a bus, or of one of its trips when 'trip_id' is given
+def _cache_key(bus_id, trip_id=None):
+    if trip_id is None:
+        return f'bookings:availability:{bus_id}'
+    return f'bookings:availability:{bus_id}:{trip_id}'
+
+# create a function that builds the availability bitmap of a bus from 'Seat' model, or of a trip from 'TripSeat' model, and caches it
+# bit 'n' of the bitmap (bit n % 8 of byte n // 8) is set when the seat at position 'n' is booked
+# the bitmap is cached with 'version', the version of the bus read before the seats, so a bitmap read before a booking committed carries a version the booking moved past
+def _build(bus_id, trip_id, version):
+    if trip_id is None:
+        seats = list(Seat.objects.filter(bus_id=bus_id).values_list('position', 'is_booked'))
+    else:
+        seats = list(TripSeat.objects.filter(trip_id=trip_id).values_list('seat__position', 'is_booked'))
+    if not seats:
+        return None
+
+    no_of_seats = max(position for position, is_booked in seats) + 1
+    bitmap = bytearray((no_of_seats + 7) // 8)
+    for position, is_booked in seats:
+        if is_booked:
+            bitmap[position // 8] |= 1 << (position % 8)
+
+    cache.set(_cache_key(bus_id, trip_id), (version, no_of_seats, bytes(bitmap)), CACHE_TIMEOUT)
+    return no_of_seats, bytes(bitmap)
+
+# create a function that returns a tuple of (number of seats, bitmap of booked seats) of a bus or trip, or None if the bus has no seats
+# a cached bitmap is only served while its version is the current version of the bus, otherwise it is built again
+def get_availability(bus_id, trip_id=None):
+    key = _cache_key(bus_id, trip_id)
+    cached = cache.get_many([key, _version_key(bus_id)]) # one round trip for the bitmap and the version
+    version = cached.get(_version_key(bus_id)) or get_version(bus_id)
+
+    availability = cached.get(key)
+    if availability is not None and availability[0] == version:
+        return availability[1:]
+    return _build(bus_id, trip_id, version)
+
+# create a function that returns availability of a bus when 'trip' is None and of the trip otherwise
+# a trip that was not created yet (see 'engine.find_trip') has every seat of the bus free, so its bitmap is the size of the bus bitmap with no bit set
+def get_trip_availability(bus_id, trip=None):
+    if trip is None or trip.pk is not None:
+        return get_availability(bus_id, trip and trip.pk)
+
+    seats = get_availability(bus_id)
+    return seats and (seats[0], bytes(len(seats[1])))
+
+# create a function that marks seats at given positions of a bus or trip as booked or free in the cached bitmap, it runs after the change committed
+# moving the version forward makes every cached bitmap of the bus stale, the bitmap of the changed bus or trip is updated in place and moved to the new version
+# only when it was cached at the version right before it, any other bitmap may miss changes and is built from the database on the next read
+def mark_seats(bus_id, positions, is_booked, trip_id=None):
+    version = bump_version(bus_id) # seats of the bus changed, so cached details of the bus are stale too
+
+    availability = cache.get(_cache_key(bus_id, trip_id))
+    if availability is None or availability[0] != version - 1:
+        return
+
+    _, no_of_seats, bitmap = availability
+    bitmap = bytearray(bitmap)
+    for position in positions:
+        if is_booked:
+            bitmap[position // 8] |= 1 << (position % 8)
+        else:
+            bitmap[position // 8] &= ~(1 << (position % 8))
+
+    cache.set(_cache_key(bus_id, trip_id), (version, no_of_seats, bytes(bitmap)), CACHE_TIMEOUT)
+
+# create a function that makes the cached bitmaps of a bus and all of its trips stale, used when seats of the bus change outside the booking engine
+def invalidate(bus_id):
+    bump_version(bus_id)
+
+# create a function that returns the cache key of the version counter of a bus
+def _version_key(bus_id):
+    return f'bookings:version:{bus_id}'
+
+# create a function that returns the version of a bus, which changes every time the bus or the booked state of its seats changes
+# a counter that is not cached starts from the current time in nanoseconds, so it never repeats a version handed out before it was evicted
+def get_version(bus_id):
+    key = _version_key(bus_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+# create a function that moves the version of a bus forward and returns the new version, called after seats are booked or freed and when the bus changes
+def bump_version(bus_id):
+    try:
+        return cache.incr(_version_key(bus_id))
+    except ValueError: # counter is not cached, start a new one
+        return get_version(bus_id)
+
+# create a function that returns the number of free seats in a bitmap
+def count_available(no_of_seats, bitmap):
+    return no_of_seats - sum(byte.bit_count() for byte in bitmap)
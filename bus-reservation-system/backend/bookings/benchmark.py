@@ -0,0 +1,124 @@
+import statistics # import statistics to compute latency percentiles
+import threading # import threading to drive the API with concurrent clients
+import time # import time to measure latency and throughput
+from itertools import count # import count to hand out request numbers to clients
+
+from django.contrib.auth.models import User # import User model to seed the users who book seats
+from django.db import connection # import connection to count queries and close the connection of every client thread
+from django.test.utils import CaptureQueriesContext # import CaptureQueriesContext to count queries run by a request
+from rest_framework.authtoken.models import Token # import Token to authenticate the clients
+from rest_framework.test import APIClient # import APIClient to call the API in process
+from .models import Bus, Seat # import the models
+from .signals import create_seats_for_buses # import create_seats_for_buses to seat the seeded buses in bulk
+
+# metrics compared with a baseline and whether a higher value is worse
+COMPARED_METRICS = {'p95_ms': True, 'queries_per_request': True, 'throughput': False}
+QUERY_TOLERANCE = 0.5 # queries per request the average may grow by, it varies since concurrent clients race for cache misses, a query added to every request exceeds it
+
+# create a function that seeds 'buses' buses with 'seats' seats each and 'users' users with tokens, and returns the seeded data needed by the scenarios
+def seed(buses, seats, users):
+    bus_objects = Bus.objects.bulk_create([
+        Bus(bus_name='Benchmark', number=f'BM{i}', origin='Pune', destination='Goa', features='AC',
+            start_time='10:00', reach_time='18:00', no_of_seats=seats, price='500.00')
+        for i in range(buses)
+    ])
+    create_seats_for_buses(bus_objects)
+
+    user_objects = User.objects.bulk_create([User(username=f'benchmark{i}') for i in range(users)])
+    tokens = Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in user_objects])
+
+    return {
+        'bus_ids': [bus.id for bus in bus_objects],
+        'seat_ids': list(Seat.objects.order_by('id').values_list('id', flat=True)),
+        'users': [(token.user_id, token.key) for token in tokens],
+    }
+
+# create a function that returns the scenarios of the benchmark, every scenario maps a request number to (method, path, data, token)
+def scenarios(data):
+    bus_ids, seat_ids, users = data['bus_ids'], data['seat_ids'], data['users']
+    return {
+        'list_buses': lambda n: ('get', '/api/buses/', None, None),
+        'bus_detail': lambda n: ('get', f'/api/buses/{bus_ids[n % len(bus_ids)]}/', None, None),
+        'book_seat': lambda n: ('post', '/api/booking/', {'seat': seat_ids[n % len(seat_ids)]}, users[n % len(users)][1]), # every request books a different seat while there are free seats
+        'user_bookings': lambda n: ('get', f'/api/user/{users[n % len(users)][0]}/bookings/?page_size=20', None, users[n % len(users)][1]),
+    }
+
+# create a function that sends 'requests' requests of a scenario from 'clients' concurrent clients and returns latency, throughput and queries per request
+def run_scenario(request_for, requests, clients):
+    numbers = count()
+    lock = threading.Lock()
+    latencies, queries, errors = [], [], []
+
+    # create a function run by every client thread, it sends requests until all of them are sent
+    def client():
+        api = APIClient()
+        try:
+            while True:
+                with lock:
+                    n = next(numbers)
+                if n >= requests:
+                    return
+
+                method, path, data, token = request_for(n)
+                api.credentials(**({'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}))
+
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(api, method)(path, data)
+                    elapsed = time.perf_counter() - started
+
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(len(captured))
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+        finally:
+            connection.close() # every thread opens its own connection
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    return summarize(latencies, queries, errors, duration)
+
+# create a function that summarizes measured requests
+def summarize(latencies, queries, errors, duration):
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(percentiles[49] * 1000, 2),
+        'p95_ms': round(percentiles[94] * 1000, 2),
+        'p99_ms': round(percentiles[98] * 1000, 2),
+        'throughput': round(len(latencies) / duration, 1) if duration else 0,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0,
+    }
+
+# create a function that compares results with a baseline and returns a list of regressions
+# a metric regresses when it is worse than the baseline by more than 'tolerance' (0.2 is 20%), queries per request when they grow by more than 'query_tolerance' queries
+# queries are compared by difference rather than ratio, since averages below one query per request would fail a ratio on a single cache miss
+def compare(results, baseline, tolerance, query_tolerance=QUERY_TOLERANCE):
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            if metric not in expected:
+                continue
+
+            if metric == 'queries_per_request':
+                regressed = result[metric] > expected[metric] + query_tolerance
+            elif higher_is_worse:
+                regressed = result[metric] > expected[metric] * (1 + tolerance)
+            else:
+                regressed = result[metric] < expected[metric] * (1 - tolerance)
+
+            if regressed:
+                regressions.append(f'{name} {metric}: {result[metric]} (baseline {expected[metric]})')
+    return regressions
@@ -0,0 +1,74 @@
+import asyncio # import asyncio to queue messages for streams served by the ASGI event loop
+import threading # import threading to guard subscribers shared by request threads and the event loop
+from collections import defaultdict # import defaultdict to keep subscribers grouped by bus
+
+QUEUE_SIZE = 100 # messages a slow subscriber may fall behind before it is told to load the seat map again
+
+# create a class that holds the messages of a bus for one open stream
+# messages are published from request threads while the stream reads them on the event loop, so they are handed over with 'call_soon_threadsafe'
+class Subscription:
+    def __init__(self, bus_id):
+        self.bus_id = bus_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False # set when a message was dropped, the stream can not be patched any more and must start again from a snapshot
+
+    # put a message in the queue, runs on the event loop of the stream
+    def _deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    # return the next message, or None when no message arrives within 'timeout' seconds
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+# create a class that passes messages published for a bus to every stream subscribed to the bus within this process
+# streams served by other processes do not see the messages, a broker shared by processes (like Redis pub/sub) can replace it with the same methods
+class LocalBroker:
+    def __init__(self):
+        self._subscribers = defaultdict(set) # bus id -> open subscriptions
+        self._lock = threading.Lock()
+
+    # create a subscription to the messages of a bus, must be called on the event loop that reads it
+    def subscribe(self, bus_id):
+        subscription = Subscription(bus_id)
+        with self._lock:
+            self._subscribers[bus_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.bus_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.bus_id]
+
+    # send a message to every stream of a bus, can be called from any thread
+    def publish(self, bus_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(bus_id, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, message)
+            except RuntimeError: # event loop of the stream is closed, the stream is gone
+                self.unsubscribe(subscription)
+
+broker = LocalBroker() # broker used by the booking engine and the seat map streams
+
+# create a function that tells streams of a bus that seats were booked or freed, called after the transaction that changed the seats commits
+# messages carry the departure date of the trip, so streams of a date whose trip was created by this very booking recognise it
+def publish_seats(bus_id, seats, is_booked, trip=None):
+    broker.publish(bus_id, {
+        'bus': bus_id,
+        'trip': trip and trip.id,
+        'date': trip and trip.departure_date.isoformat(),
+        'is_booked': is_booked,
+        'seats': [{'id': seat.id, 'position': seat.position} for seat in seats],
+    })
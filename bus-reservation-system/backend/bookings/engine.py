@@ -0,0 +1,337 @@
+from datetime import date, timedelta # import date to accept departure dates that were already parsed and timedelta to compute when holds expire
+
+from django.conf import settings # import settings to read how long a seat hold lasts
+from django.db.models import Q # import Q to describe seats that can be claimed by a user
+from django.db import IntegrityError, transaction # import transaction to book and cancel seats atomically and IntegrityError to detect a seat booked by a concurrent request
+from django.utils import timezone # import timezone to get today's date
+from django.utils.dateparse import parse_date # import parse_date to read departure dates sent by clients
+from .models import Seat, Trip, TripSeat, Booking, BookingEvent, WaitlistEntry # import the models
+from .signals import SEAT_BATCH_SIZE # import SEAT_BATCH_SIZE to insert seat inventory of a trip in batches
+from . import availability # import availability to keep the cached seat bitmap of a bus in sync with bookings
+from . import pricing # import pricing to charge the current fare of a seat
+from . import broadcast # import broadcast to push booked and freed seats to open seat map streams
+from . import events # import events to record booking events in the outbox within the booking transaction
+
+MAX_SEATS_PER_BOOKING = 10 # maximum number of seats a single multi-seat booking can claim
+
+HOLD_DURATION = timedelta(minutes=getattr(settings, 'SEAT_HOLD_MINUTES', 10)) # time a seat stays reserved for a user during checkout
+
+BOOKING_HORIZON = timedelta(days=getattr(settings, 'BOOKING_HORIZON_DAYS', 180)) # how far ahead trips can be booked or looked up
+
+# create a base exception for every reason a seat can not be booked or cancelled, views turn it into an error response
+class BookingError(Exception):
+    message = 'Booking failed'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+
+# raised when the seat to book does not exist
+class SeatNotFound(BookingError):
+    message = 'Invalid Seat ID'
+
+# raised when the seat to book was already booked, including by a concurrent request that won the race for it
+class SeatAlreadyBooked(BookingError):
+    message = 'Seat already booked'
+
+# raised when the seat to book or hold is reserved by another user whose hold has not expired yet
+class SeatHeld(SeatAlreadyBooked):
+    message = 'Seat is on hold'
+
+# raised when a trip to book, look up or cancel has already departed
+class TripDeparted(BookingError):
+    message = 'Trip has already departed'
+
+# raised when the booking to cancel does not exist or belongs to another user
+class BookingNotFound(BookingError):
+    message = 'Booking not found or unauthorized'
+
+# raised when the hold to release does not exist or belongs to another user
+class HoldNotFound(BookingError):
+    message = 'Hold not found or expired'
+
+# raised when a user joins the waitlist of a bus or trip that still has free seats
+class SeatsAvailable(BookingError):
+    message = 'Seats are available, book one instead of joining the waitlist'
+
+# raised when a user is already waiting for the bus or trip
+class AlreadyWaitlisted(BookingError):
+    message = 'Already on the waitlist'
+
+# raised when the waitlist entry to leave does not exist, belongs to another user or was already promoted
+class WaitlistEntryNotFound(BookingError):
+    message = 'Waitlist entry not found'
+
+# create a function that turns a departure date sent by a client into a date, returns None when no date was sent
+def _parse_date(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        parsed = parse_date(str(value))
+    except ValueError: # well formatted but impossible date like '2025-02-30'
+        parsed = None
+    if parsed is None:
+        raise BookingError('Invalid departure date')
+    return parsed
+
+# create a function that turns a departure date sent by a client into a date of a trip that can be booked, between today and 'BOOKING_HORIZON' ahead
+def _departure_date(value):
+    departure_date = _parse_date(value)
+    today = timezone.localdate()
+    if departure_date < today:
+        raise TripDeparted()
+    if departure_date > today + BOOKING_HORIZON:
+        raise BookingError(f'Trips can only be booked up to {BOOKING_HORIZON.days} days ahead')
+    return departure_date
+
+# create a function that returns the trip of a bus on a date without creating it, used by read only requests so that looking at a date never writes rows
+# a trip nobody booked yet is returned unsaved, its 'pk' is None and every seat of the bus is free on it
+def find_trip(bus_id, departure_date):
+    departure_date = _departure_date(departure_date)
+    trip = Trip.objects.filter(bus_id=bus_id, departure_date=departure_date).first()
+    return trip or Trip(bus_id=bus_id, departure_date=departure_date)
+
+# create a function that returns the trip of a bus on a date, creating it with a free seat for every seat of the bus the first time it is needed
+# only paths that book or hold seats create trips
+def get_trip(bus_id, departure_date):
+    trip = find_trip(bus_id, departure_date)
+    if trip.pk is not None:
+        return trip
+    departure_date = trip.departure_date
+
+    seat_ids = list(Seat.objects.filter(bus_id=bus_id).values_list('id', flat=True))
+    if not seat_ids:
+        raise BookingError('Invalid Bus ID')
+
+    try:
+        with transaction.atomic():
+            trip = Trip.objects.create(bus_id=bus_id, departure_date=departure_date)
+            TripSeat.objects.bulk_create([TripSeat(trip=trip, seat_id=seat_id) for seat_id in seat_ids], batch_size=SEAT_BATCH_SIZE)
+            return trip
+    except IntegrityError: # a concurrent request created the trip first
+        return Trip.objects.get(bus_id=bus_id, departure_date=departure_date)
+
+# create a function that returns the rows holding 'is_booked' of seats and the name of their seat id field
+# those are 'Seat' rows for bookings without a trip and 'TripSeat' rows of the trip otherwise
+def _inventory(trip):
+    if trip is None:
+        return Seat.objects.all(), 'id'
+    return TripSeat.objects.filter(trip=trip), 'seat_id'
+
+# create a function that returns the trip a seat is sold for on 'departure_date', or None when no date is given and the seat is sold as is
+def _trip_for_seat(seat_id, departure_date):
+    if _parse_date(departure_date) is None:
+        return None
+
+    bus_id = Seat.objects.filter(id=seat_id).values_list('bus_id', flat=True).first()
+    if bus_id is None:
+        raise SeatNotFound()
+    return get_trip(bus_id, departure_date)
+
+# create a function that returns the condition matching seats a user may claim: not held by anyone, held with an expired hold, or held by the user
+# treating expired holds as free releases them lazily, so an abandoned checkout never blocks a seat for longer than its hold
+def _claimable_by(user, now):
+    return Q(held_until__isnull=True) | Q(held_until__lt=now) | Q(held_by=user)
+
+# create a function that raises the reason a seat could not be claimed by a user
+def _raise_unclaimable(seats):
+    if not seats.exists():
+        raise SeatNotFound()
+    if seats.filter(is_booked=True).exists():
+        raise SeatAlreadyBooked()
+    raise SeatHeld()
+
+# create a function that updates the cached seat bitmap and notifies seat map streams after seats were booked or freed, it runs once the transaction commits
+def _seats_changed(bus_id, seats, is_booked, trip):
+    availability.mark_seats(bus_id, [seat.position for seat in seats], is_booked, trip and trip.id)
+    broadcast.publish_seats(bus_id, seats, is_booked, trip)
+
+# create a function that books a seat for a user, on the trip departing on 'departure_date' when it is given, and returns the created booking
+# the seat is claimed with a single conditional UPDATE, so out of many concurrent requests for the same seat only one can change 'is_booked' from False to True
+# unique constraints on 'Booking' guarantee the same thing at the database level even for code that flips 'is_booked' directly
+def book_seat(user, seat_id, departure_date=None):
+    try:
+        trip = _trip_for_seat(seat_id, departure_date)
+        inventory, seat_field = _inventory(trip)
+        seats = inventory.filter(**{seat_field: seat_id})
+
+        # the fare is quoted before the seat is claimed, so a seat bitmap built on a cache miss is read from committed seats only
+        seat = Seat.objects.select_related('bus').filter(id=seat_id).first()
+        price = seat and pricing.quote(seat.bus_id, trip, seat.bus)
+
+        with transaction.atomic():
+            # a seat held by the user is booked by the same UPDATE that releases the hold, which converts the hold into the booking atomically
+            claimed = seats.filter(_claimable_by(user, timezone.now()), is_booked=False).update(is_booked=True, held_by=None, held_until=None)
+
+            # nothing was updated, so the seat either does not exist, is already booked or is held by someone else
+            if not claimed:
+                _raise_unclaimable(seats)
+
+            booking = Booking.objects.create(user=user, bus=seat.bus, seat=seat, trip=trip, price_paid=price)
+            events.record(BookingEvent.CREATED, [booking])
+            transaction.on_commit(lambda: _seats_changed(seat.bus_id, [seat], True, trip))
+            return booking
+
+    except (ValueError, TypeError): # seat id that is not a number
+        raise SeatNotFound()
+
+    except IntegrityError: # another booking for the seat was committed first
+        raise SeatAlreadyBooked()
+
+# create a function that books several seats of a bus for a user in one go, on the trip departing on 'departure_date' when it is given, and returns the created bookings
+# either every seat is booked or none of them is, and the number of queries does not depend on the number of seats
+def book_seats(user, bus_id, seat_ids, departure_date=None):
+    try:
+        seat_ids = sorted({int(seat_id) for seat_id in seat_ids}) # drop repeated seat ids
+    except (ValueError, TypeError): # seat id that is not a number
+        raise SeatNotFound()
+
+    if not seat_ids:
+        raise BookingError('No seats selected')
+
+    if len(seat_ids) > MAX_SEATS_PER_BOOKING:
+        raise BookingError(f'At most {MAX_SEATS_PER_BOOKING} seats can be booked at once')
+
+    try:
+        trip = get_trip(bus_id, departure_date) if _parse_date(departure_date) is not None else None
+        inventory, seat_field = _inventory(trip)
+        if trip is None:
+            inventory = inventory.filter(bus_id=bus_id)
+
+        # every seat of the batch is charged the fare quoted before the seats are claimed, so a seat bitmap built on a cache miss is read from committed seats only
+        seats = list(Seat.objects.select_related('bus').filter(id__in=seat_ids))
+        price = pricing.quote(seats[0].bus_id, trip, seats[0].bus) if seats else None
+
+        with transaction.atomic():
+            inventory = inventory.filter(**{f'{seat_field}__in': seat_ids})
+            claimed = inventory.filter(_claimable_by(user, timezone.now()), is_booked=False).update(is_booked=True, held_by=None, held_until=None)
+
+            # some seats were not updated, so raising here rolls back the seats that were claimed
+            if claimed != len(seat_ids):
+                if inventory.count() != len(seat_ids):
+                    raise SeatNotFound()
+                raise SeatAlreadyBooked('One or more seats are already booked or on hold')
+
+            bookings = Booking.objects.bulk_create([Booking(user=user, bus=seat.bus, seat=seat, trip=trip, price_paid=price) for seat in seats])
+            events.record(BookingEvent.CREATED, bookings)
+            transaction.on_commit(lambda: _seats_changed(seats[0].bus_id, seats, True, trip))
+            return bookings
+
+    except (ValueError, TypeError): # bus id that is not a number
+        raise BookingError('Invalid Bus ID')
+
+    except IntegrityError: # another booking for one of the seats was committed first
+        raise SeatAlreadyBooked('One or more seats are already booked')
+
+# create a function that cancels the booking of a seat made by a user, on the trip departing on 'departure_date' when it is given, and frees the seat again
+def cancel_booking(user, seat_id, departure_date=None):
+    departure_date = _parse_date(departure_date)
+
+    # bookings of a departed trip are kept as they are, cancelling one would also hand its seat to somebody on the waitlist of a bus that has left
+    if departure_date is not None and departure_date < timezone.localdate():
+        raise TripDeparted()
+
+    bookings = Booking.objects.select_related('seat', 'trip').filter(seat_id=seat_id, user=user)
+    if departure_date is None:
+        bookings = bookings.filter(trip__isnull=True)
+    else:
+        bookings = bookings.filter(trip__departure_date=departure_date)
+
+    with transaction.atomic():
+        # lock the booking so that a concurrent cancel of the same seat waits for this one and then finds nothing to cancel
+        booking = bookings.select_for_update(of=('self',)).first()
+
+        # the booking may still have been deleted meanwhile on databases that ignore row locks, only the request that deletes it goes on
+        if booking is None or not Booking.objects.filter(id=booking.id).delete()[0]:
+            raise BookingNotFound()
+
+        seat, trip = booking.seat, booking.trip
+        events.record(BookingEvent.CANCELLED, [booking])
+
+        # hand the seat to the head of the waitlist within the same transaction, the seat then stays booked and is never seen as free
+        if _promote_waitlist(seat, trip) is not None:
+            return
+
+        inventory, seat_field = _inventory(trip)
+        inventory.filter(**{seat_field: seat_id}).update(is_booked=False)
+        transaction.on_commit(lambda: _seats_changed(seat.bus_id, [seat], False, trip))
+
+# create a function that books a freed seat for the user at the head of the waitlist of its bus or trip and returns the booking, or None if nobody is waiting
+# it must be called inside the transaction that freed the seat, rows of the waitlist are locked so that two cancellations never promote the same entry
+def _promote_waitlist(seat, trip):
+    entry = (
+        WaitlistEntry.objects.select_for_update(skip_locked=True)
+        .filter(bus_id=seat.bus_id, trip=trip, promoted_at__isnull=True)
+        .order_by('-priority', 'created_at', 'id')
+        .first()
+    )
+    if entry is None:
+        return None
+
+    booking = Booking.objects.create(user_id=entry.user_id, bus_id=seat.bus_id, seat=seat, trip=trip, price_paid=pricing.quote(seat.bus_id, trip))
+    events.record(BookingEvent.CREATED, [booking])
+    WaitlistEntry.objects.filter(id=entry.id).update(booking=booking, promoted_at=timezone.now())
+    return booking
+
+# create a function that puts a user on the waitlist of a sold out bus, or of its trip departing on 'departure_date' when it is given, and returns the entry
+def join_waitlist(user, bus_id, departure_date=None):
+    try:
+        trip = find_trip(bus_id, departure_date) if _parse_date(departure_date) is not None else None
+        seats = availability.get_trip_availability(bus_id, trip) # a trip that was not created yet has free seats, so nobody waits for it
+    except (ValueError, TypeError): # bus id that is not a number
+        raise BookingError('Invalid Bus ID')
+
+    if seats is None:
+        raise BookingError('Invalid Bus ID')
+    if availability.count_available(*seats):
+        raise SeatsAvailable()
+
+    try:
+        with transaction.atomic():
+            return WaitlistEntry.objects.create(user=user, bus_id=bus_id, trip=trip)
+    except IntegrityError: # the user is already waiting
+        raise AlreadyWaitlisted()
+
+# create a function that removes a user from a waitlist before being promoted
+def leave_waitlist(user, entry_id):
+    deleted, _ = WaitlistEntry.objects.filter(id=entry_id, user=user, promoted_at__isnull=True).delete()
+    if not deleted:
+        raise WaitlistEntryNotFound()
+
+# create a function that reserves a seat for a user during checkout, on the trip departing on 'departure_date' when it is given, and returns when the hold expires
+# holding a seat the user already holds extends the hold, booking the seat afterwards converts the hold into a booking
+def hold_seat(user, seat_id, departure_date=None):
+    try:
+        trip = _trip_for_seat(seat_id, departure_date)
+        inventory, seat_field = _inventory(trip)
+        seats = inventory.filter(**{seat_field: seat_id})
+
+        now = timezone.now()
+        held_until = now + HOLD_DURATION
+        if not seats.filter(_claimable_by(user, now), is_booked=False).update(held_by=user, held_until=held_until):
+            _raise_unclaimable(seats)
+        return held_until
+
+    except (ValueError, TypeError): # seat id that is not a number
+        raise SeatNotFound()
+
+# create a function that releases the hold of a user on a seat before it expires
+def release_hold(user, seat_id, departure_date=None):
+    try:
+        trip = _trip_for_seat(seat_id, departure_date)
+    except SeatNotFound:
+        raise HoldNotFound()
+
+    inventory, seat_field = _inventory(trip)
+    if not inventory.filter(**{seat_field: seat_id}, held_by=user, held_until__gte=timezone.now()).update(held_by=None, held_until=None):
+        raise HoldNotFound()
+
+# create a function that clears expired holds so that 'held_by' and 'held_until' of free seats do not pile up, returns the number of released seats
+# expired holds already stop blocking seats when they expire, this only tidies the rows and is run by 'release_expired_holds' command
+def release_expired_holds():
+    now = timezone.now()
+    return sum(
+        model.objects.filter(held_until__lt=now).update(held_by=None, held_until=None)
+        for model in (Seat, TripSeat)
+    )
@@ -0,0 +1,91 @@
+import logging # import logging to report failed deliveries
+import os # import os to name workers after their process id
+import uuid # import uuid to give every worker a unique name
+from datetime import timedelta # import timedelta to compute leases and retry delays
+from functools import lru_cache # import lru_cache to import consumers once per process
+
+from django.conf import settings # import settings to read the list of consumers
+from django.utils import timezone # import timezone to get the current time
+from django.utils.module_loading import import_string # import import_string to load consumers from their dotted path
+from .models import BookingEvent # import BookingEvent model which is the outbox of booking events
+
+logger = logging.getLogger(__name__)
+
+LEASE = timedelta(seconds=60) # time a worker holds a batch of events before other workers may pick it up again, for example after the worker crashed
+MAX_ATTEMPTS = 10 # number of failed deliveries after which an event is left alone for someone to inspect
+MAX_RETRY_DELAY = timedelta(minutes=10) # longest time a failed event waits before it is retried
+
+# create a function that returns the payload of an event describing a booking
+def _payload(booking):
+    return {
+        'booking': booking.id,
+        'user': booking.user_id,
+        'bus': booking.bus_id,
+        'seat': booking.seat_id,
+        'trip': booking.trip_id,
+        'booking_time': booking.booking_time.isoformat() if booking.booking_time else None,
+    }
+
+# create a function that records an event for every given booking, it must be called inside the transaction that changed the bookings
+# consumers are not called here, so the latency of a booking does not depend on how many consumers are attached
+def record(kind, bookings):
+    BookingEvent.objects.bulk_create([BookingEvent(kind=kind, payload=_payload(booking)) for booking in bookings])
+
+# create a function that returns the consumers listed in 'BOOKING_EVENT_CONSUMERS' setting
+# a consumer is a function that takes a list of 'BookingEvent' and raises an exception when the batch has to be retried
+# events are delivered at least once, so consumers must tolerate seeing an event again
+@lru_cache(maxsize=None)
+def get_consumers():
+    return tuple(import_string(path) for path in getattr(settings, 'BOOKING_EVENT_CONSUMERS', []))
+
+# create a function that returns a unique name of a worker
+def worker_name():
+    return f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+# create a function that leases a batch of pending events to a worker and returns them
+# leasing is a conditional UPDATE, so workers running in parallel never pick the same event
+def _claim(worker, batch_size):
+    now = timezone.now()
+    pending = BookingEvent.objects.filter(processed_at__isnull=True, available_at__lte=now, attempts__lt=MAX_ATTEMPTS)
+    ids = list(pending.order_by('available_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+
+    pending.filter(id__in=ids).update(locked_by=worker, available_at=now + LEASE)
+    return list(BookingEvent.objects.filter(id__in=ids, locked_by=worker, processed_at__isnull=True).order_by('id'))
+
+# create a function that delivers one batch of pending events to every consumer and returns the number of events in the batch
+# a batch that fails is retried as a whole with an exponentially growing delay
+def process_batch(worker, batch_size=100):
+    events = _claim(worker, batch_size)
+    if not events:
+        return 0
+
+    ids = [event.id for event in events]
+    try:
+        for consumer in get_consumers():
+            consumer(events)
+
+    except Exception as error:
+        logger.exception('Delivering booking events %s failed', ids)
+        for event in events:
+            event.attempts += 1
+            event.last_error = repr(error)
+            event.locked_by = ''
+            event.available_at = timezone.now() + min(timedelta(seconds=2 ** event.attempts), MAX_RETRY_DELAY)
+        BookingEvent.objects.bulk_update(events, ['attempts', 'last_error', 'locked_by', 'available_at'])
+
+    else:
+        BookingEvent.objects.filter(id__in=ids, locked_by=worker).update(processed_at=timezone.now(), locked_by='')
+
+    return len(events)
+
+# create a function that delivers pending events until none is left and returns the number of events it processed
+def drain(worker=None, batch_size=100):
+    worker = worker or worker_name()
+    total = 0
+    while True:
+        processed = process_batch(worker, batch_size)
+        if not processed:
+            return total
+        total += processed
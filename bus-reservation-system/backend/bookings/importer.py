@@ -0,0 +1,136 @@
+import csv # import csv to read buses from CSV files one row at a time
+import io # import io to read uploaded files as text
+import json # import json to read buses from JSON lines files
+from itertools import islice # import islice to cut the stream of rows into chunks
+
+from django.db import IntegrityError, transaction # import transaction to write every chunk of buses atomically and IntegrityError to detect buses inserted concurrently
+from rest_framework import serializers # import serializers to catch validation errors of rows
+from .models import Bus # import Bus model
+from .serializers import BusImportSerializer # import BusImportSerializer to validate rows like buses sent to the API
+from .signals import create_seats_for_buses # import create_seats_for_buses to insert seats of new buses in bulk
+from . import availability # import availability to move the version of updated buses
+from . import pricing # import pricing to drop fare tiers of updated buses
+
+CHUNK_SIZE = 1000 # number of rows validated and written by a single transaction
+MAX_ERRORS = 100 # number of invalid rows reported in detail, the rest are only counted
+FORMATS = ('csv', 'jsonl')
+SEAT_FIELDS = ('no_of_seats', 'layout') # fields that decide the seats of a bus, which can not be changed once seats may be booked
+
+UPDATE_FIELDS = [field.name for field in Bus._meta.concrete_fields if field.name not in ('id', 'number')] # fields written when an existing bus is updated
+
+# create a function that returns the format of a file from its name, or None if it can not be told
+def guess_format(name):
+    name = (name or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+# create a generator that yields (line number, row) for every row of a text stream, without reading the whole stream in memory
+def read_rows(stream, format):
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line_num, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_num, json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield line_num, error # reported as an invalid row
+
+# create a function that returns the text stream of a binary file like an uploaded file
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+# create a function that validates a chunk of rows and returns the valid ones keyed by bus number along with the errors of the invalid ones
+# the rows are validated by one list serializer so that fields of the serializer are built once per chunk instead of once per row
+# blank values are dropped so that missing optional columns (like 'layout') take their default values
+def _validate(chunk):
+    valid, errors, rows = {}, [], []
+    for line_num, row in chunk:
+        if isinstance(row, dict):
+            rows.append((line_num, {key: value for key, value in row.items() if key and value not in ('', None)}))
+        else:
+            errors.append({'line': line_num, 'errors': str(row) if isinstance(row, Exception) else 'Row must be an object'})
+
+    child = BusImportSerializer()
+    for line_num, row in rows:
+        try:
+            data = child.run_validation(row)
+        except serializers.ValidationError as error:
+            errors.append({'line': line_num, 'errors': error.detail})
+        else:
+            valid[data['number']] = (line_num, data) # a number repeated within the chunk keeps its last row
+    return valid, errors
+
+# create a function that inserts new buses with their seats and updates existing ones in a single transaction, returns the numbers created and updated along with errors
+def _write(valid):
+    errors = []
+    with transaction.atomic():
+        existing = Bus.objects.in_bulk(list(valid), field_name='number')
+
+        new, changed = [], []
+        for number, (line_num, data) in valid.items():
+            bus = existing.get(number)
+            if bus is None:
+                new.append(Bus(**data))
+                continue
+
+            # changing seats of an existing bus would break bookings of its current seats
+            if any(field in data and data[field] != getattr(bus, field) for field in SEAT_FIELDS):
+                errors.append({'line': line_num, 'errors': 'Seats of an existing bus can not be changed by an import'})
+                continue
+
+            # rows that repeat the bus as it is are skipped, which keeps imports of a whole fleet cheap when only a few buses changed
+            if all(getattr(bus, field) == value for field, value in data.items()):
+                continue
+
+            for field, value in data.items():
+                setattr(bus, field, value)
+            changed.append(bus)
+
+        buses = Bus.objects.bulk_create(new)
+        create_seats_for_buses(buses)
+        Bus.objects.bulk_update(changed, UPDATE_FIELDS)
+
+        # cached details and fare tiers of updated buses must not be served any more, 'bulk_update' sends no 'post_save' signal that would drop them
+        transaction.on_commit(lambda: [(availability.bump_version(bus.id), pricing.invalidate(bus.id)) for bus in changed])
+
+    return len(buses), len(changed), errors
+
+# create a function that imports buses from a text stream of CSV or JSON lines in chunks of 'chunk_size' rows and returns a report
+# every chunk is validated and written by one transaction, so memory use does not grow with the file and a failed chunk leaves earlier chunks imported
+# buses are upserted by 'number', new buses get their seats with one batched INSERT per chunk instead of one 'post_save' signal per bus
+# 'progress' is called with the report so far after every chunk
+def import_buses(stream, format, chunk_size=CHUNK_SIZE, progress=None):
+    if format not in FORMATS:
+        raise ValueError(f'Unknown import format {format!r}, use one of {", ".join(FORMATS)}')
+
+    report = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'errors': []}
+    rows = read_rows(stream, format)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return report
+
+        valid, errors = _validate(chunk)
+        if valid:
+            try:
+                created, updated, write_errors = _write(valid)
+                report['created'] += created
+                report['updated'] += updated
+                report['unchanged'] += len(valid) - created - updated - len(write_errors)
+                errors += write_errors
+            except IntegrityError: # a bus of the chunk was inserted by someone else meanwhile, the chunk is rolled back
+                errors += [{'line': line_num, 'errors': 'Chunk was rolled back since a bus number was inserted concurrently'} for line_num, data in valid.values()]
+
+        report['rows'] += len(chunk)
+        report['failed'] += len(errors)
+        report['errors'] += errors[:max(MAX_ERRORS - len(report['errors']), 0)]
+
+        if progress is not None:
+            progress(report)
@@ -0,0 +1,28 @@
+from functools import lru_cache # import lru_cache to compute seat numbers of a layout once and reuse them for every bus that shares it
+
+# each layout maps to a tuple of (human readable label, seat letters of one row, prefix of every seat number)
+# a layout without row letters numbers seats sequentially like 'S1', 'S2', ... which is how seats were always numbered
+SEAT_LAYOUTS = {
+    'standard': ('Standard', '', 'S'),
+    '2x2_seater': ('2x2 Seater', 'ABCD', ''),
+    '2x1_seater': ('2x1 Seater', 'ABC', ''),
+    '2x2_sleeper': ('2x2 Sleeper', 'ABCD', 'SL'),
+    '2x1_sleeper': ('2x1 Sleeper', 'ABC', 'SL'),
+}
+
+DEFAULT_LAYOUT = 'standard' # layout used when a bus does not specify one
+
+LAYOUT_CHOICES = [(key, label) for key, (label, letters, prefix) in SEAT_LAYOUTS.items()] # choices for the 'layout' field of 'Bus' model
+
+# create a function that returns the seat numbers of a bus with given layout and number of seats
+# result is cached so that buses sharing the same layout and capacity reuse the already computed tuple instead of formatting every row again
+@lru_cache(maxsize=256)
+def seat_numbers(layout, no_of_seats):
+    label, letters, prefix = SEAT_LAYOUTS.get(layout, SEAT_LAYOUTS[DEFAULT_LAYOUT]) # fall back to the standard layout for unknown layouts
+
+    # a layout without row letters numbers its seats sequentially
+    if not letters:
+        return tuple(f"{prefix}{i}" for i in range(1, no_of_seats + 1))
+
+    # otherwise fill rows from the front, one letter per seat of the row, like '1A', '1B', '2A', ...
+    return tuple(f"{prefix}{i // len(letters) + 1}{letters[i % len(letters)]}" for i in range(no_of_seats))
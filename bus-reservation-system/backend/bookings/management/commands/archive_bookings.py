@@ -0,0 +1,19 @@
+from datetime import timedelta # import timedelta to compute the last departure date to archive
+
+from django.core.management.base import BaseCommand # import BaseCommand to create a management command
+from django.utils import timezone # import timezone to get today's date
+from bookings.archive import archive_bookings # import archive_bookings to move bookings in batches
+
+# create a management command that moves bookings of trips that already departed to 'BookingArchive' model so that 'Booking' table and its indexes only hold current bookings
+# archived bookings are still listed by 'UserBookingView', run it daily with 'python manage.py archive_bookings'
+class Command(BaseCommand):
+    help = 'Move bookings of trips that departed before a number of days ago to the booking archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=1, help='archive bookings of trips that departed at least this many days ago')
+        parser.add_argument('--batch-size', type=int, default=1000, help='number of bookings moved by a single transaction')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() - timedelta(days=options['days'])
+        moved = archive_bookings(cutoff, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} bookings of trips that departed on or before {cutoff}'))
@@ -0,0 +1,28 @@
+from datetime import timedelta # import timedelta to compute the last departure date to archive
+
+from django.core.management.base import BaseCommand # import BaseCommand to create a management command
+from django.db import transaction # import transaction to archive every batch of trips atomically
+from django.utils import timezone # import timezone to get today's date
+from bookings.models import Trip, TripSeat # import Trip and TripSeat models
+
+# create a management command that removes seat inventory of trips that already departed so that 'TripSeat' table only holds upcoming trips
+# bookings of archived trips are kept, run it daily with 'python manage.py archive_trips'
+class Command(BaseCommand):
+    help = 'Remove seat inventory of trips that departed before a number of days ago'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=1, help='archive trips that departed at least this many days ago')
+        parser.add_argument('--batch-size', type=int, default=100, help='number of trips archived by a single transaction')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() - timedelta(days=options['days'])
+        trip_ids = list(Trip.objects.filter(departure_date__lte=cutoff, is_archived=False).values_list('id', flat=True))
+
+        # delete inventory of a batch of trips and mark them archived in one transaction so that a failed run can be resumed
+        for start in range(0, len(trip_ids), options['batch_size']):
+            batch = trip_ids[start:start + options['batch_size']]
+            with transaction.atomic():
+                TripSeat.objects.filter(trip_id__in=batch).delete()
+                Trip.objects.filter(id__in=batch).update(is_archived=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {len(trip_ids)} trips that departed on or before {cutoff}'))
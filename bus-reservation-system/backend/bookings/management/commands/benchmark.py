@@ -0,0 +1,81 @@
+import json # import json to read and write baselines
+
+from django.core.management.base import BaseCommand, CommandError # import BaseCommand to create a management command and CommandError to fail on regressions
+from django.db import connection # import connection to create and destroy the benchmark database
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment # import test utilities to call the API in process without rate limits
+from bookings.benchmark import seed, scenarios, run_scenario, compare, QUERY_TOLERANCE # import the benchmark harness
+from bookings.throttling import DEFAULT_RATES # import DEFAULT_RATES to lift every rate limit while benchmarking
+
+NO_RATE_LIMIT = (10 ** 9, 10 ** 9) # burst and rate that no benchmark reaches
+
+# create a management command that seeds a fresh database and drives the API with concurrent clients, like 'python manage.py benchmark --clients 8'
+# it runs against the configured database (SQLite by default, PostgreSQL when 'POSTGRES_DB' is set) and uses a separate test database, so existing data is never touched
+# '--baseline' fails the command on regressions, which lets CI compare every change with results saved earlier by '--save-baseline'
+class Command(BaseCommand):
+    help = 'Benchmark bus listing, bus details, booking and booking history endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buses', type=int, default=50, help='number of buses to seed')
+        parser.add_argument('--seats', type=int, default=40, help='number of seats of every bus')
+        parser.add_argument('--users', type=int, default=20, help='number of users sending requests')
+        parser.add_argument('--clients', type=int, default=8, help='number of concurrent clients')
+        parser.add_argument('--requests', type=int, default=200, help='number of requests sent per scenario')
+        parser.add_argument('--scenario', action='append', help='run only this scenario, can be repeated')
+        parser.add_argument('--baseline', help='JSON file of earlier results, the command fails when results regress')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown relative to the baseline, 0.2 is 20%%')
+        parser.add_argument('--query-tolerance', type=float, default=QUERY_TOLERANCE, help='allowed growth of queries per request over the baseline, in queries')
+        parser.add_argument('--save-baseline', help='write results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['clients'] < 1:
+            raise CommandError('--requests and --clients must be at least 1')
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            rates = {scope: NO_RATE_LIMIT for scope in DEFAULT_RATES}
+            with override_settings(RATE_LIMITS=rates):
+                results = self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Saved results to {options['save_baseline']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['tolerance'], options['query_tolerance'])
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    # seed data, run every selected scenario and print a row of results per scenario
+    def run_benchmark(self, options):
+        data = seed(options['buses'], options['seats'], options['users'])
+        selected = scenarios(data)
+        unknown = set(options['scenario'] or []) - set(selected)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}, use one of {', '.join(selected)}")
+
+        self.stdout.write(f"{connection.vendor}, {options['buses']} buses x {options['seats']} seats, {options['clients']} clients, {options['requests']} requests per scenario")
+        self.stdout.write(f"{'scenario':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>10}{'errors':>8}")
+
+        results = {}
+        for name, request_for in selected.items():
+            if options['scenario'] and name not in options['scenario']:
+                continue
+
+            result = run_scenario(request_for, options['requests'], options['clients'])
+            results[name] = result
+            self.stdout.write(
+                f"{name:<16}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+                f"{result['throughput']:>10}{result['queries_per_request']:>10}{result['errors']:>8}"
+            )
+        return results
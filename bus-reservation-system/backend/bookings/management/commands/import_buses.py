@@ -0,0 +1,35 @@
+import sys # import sys to read the import file from standard input
+
+from django.core.management.base import BaseCommand, CommandError # import BaseCommand to create a management command and CommandError to report bad arguments
+from bookings.importer import CHUNK_SIZE, FORMATS, import_buses, guess_format # import import_buses to upsert buses from the file
+
+# create a management command that creates and updates buses from a CSV or JSON lines file, like 'python manage.py import_buses fleet.csv'
+# columns or keys are the fields of 'Bus' model, rows with the number of an existing bus update it
+class Command(BaseCommand):
+    help = 'Create and update buses from a CSV or JSON lines file, matched by bus number'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="file to import, or '-' to read standard input")
+        parser.add_argument('--format', choices=FORMATS, help='format of the file, guessed from its extension when not given')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='number of rows written by a single transaction')
+
+    def handle(self, *args, **options):
+        format = options['format'] or guess_format(options['path'])
+        if format is None:
+            raise CommandError('Can not tell the format of the file, pass --format')
+
+        # print the progress after every chunk
+        def progress(report):
+            self.stdout.write(f"{report['rows']} rows read, {report['created']} created, {report['updated']} updated, {report['unchanged']} unchanged, {report['failed']} failed")
+
+        if options['path'] == '-':
+            report = import_buses(sys.stdin, format, options['chunk_size'], progress)
+        else:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_buses(stream, format, options['chunk_size'], progress)
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+
+        style = self.style.SUCCESS if not report['failed'] else self.style.WARNING
+        self.stdout.write(style(f"Imported {report['rows'] - report['failed']} of {report['rows']} rows ({report['created']} created, {report['updated']} updated, {report['unchanged']} unchanged)"))
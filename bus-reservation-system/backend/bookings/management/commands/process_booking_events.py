@@ -0,0 +1,40 @@
+import multiprocessing # import multiprocessing to deliver events from a pool of worker processes
+import time # import time to wait between polls when no event is pending
+
+from django.core.management.base import BaseCommand # import BaseCommand to create a management command
+from django.db import connections # import connections to close database connections before worker processes are started
+from bookings.events import drain, worker_name # import drain to deliver pending booking events
+
+# create a function run by every worker process, it delivers pending events and waits for new ones
+def run_worker(batch_size, poll_interval, once):
+    worker = worker_name()
+    while True:
+        drain(worker, batch_size)
+        if once:
+            return
+        time.sleep(poll_interval)
+
+# create a management command that delivers booking events recorded in the outbox to the consumers listed in 'BOOKING_EVENT_CONSUMERS'
+# run it next to the web server with 'python manage.py process_booking_events --workers 4'
+class Command(BaseCommand):
+    help = 'Deliver booking events from the outbox to their consumers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=100, help='number of events delivered to consumers at once')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds a worker waits when no event is pending')
+        parser.add_argument('--once', action='store_true', help='deliver pending events and exit instead of waiting for new ones')
+
+    def handle(self, *args, **options):
+        worker_args = (options['batch_size'], options['poll_interval'], options['once'])
+
+        if options['workers'] == 1:
+            run_worker(*worker_args)
+            return
+
+        connections.close_all() # every worker process opens its own connections, inherited ones can not be shared
+        processes = [multiprocessing.Process(target=run_worker, args=worker_args) for _ in range(options['workers'])]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
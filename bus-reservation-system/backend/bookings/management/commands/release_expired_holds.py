@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand # import BaseCommand to create a management command
+from bookings.engine import release_expired_holds # import release_expired_holds to clear holds that expired
+
+# create a management command that clears expired seat holds, run it every few minutes with 'python manage.py release_expired_holds'
+# expired holds never block a seat even if this command is not run, since the booking engine treats them as free
+class Command(BaseCommand):
+    help = 'Release seat holds that expired'
+
+    def handle(self, *args, **options):
+        released = release_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired seat holds'))
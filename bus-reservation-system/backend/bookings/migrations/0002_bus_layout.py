@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bus',
+            name='layout',
+            field=models.CharField(choices=[('standard', 'Standard'), ('2x2_seater', '2x2 Seater'), ('2x1_seater', '2x1 Seater'), ('2x2_sleeper', '2x2 Sleeper'), ('2x1_sleeper', '2x1 Sleeper')], default='standard', max_length=20),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+def number_existing_seats(apps, schema_editor):
+    Seat = apps.get_model('bookings', 'Seat')
+
+    positions = {}
+    seats = []
+    for seat in Seat.objects.order_by('bus_id', 'id').only('id', 'bus_id'):
+        seat.position = positions.get(seat.bus_id, 0)
+        positions[seat.bus_id] = seat.position + 1
+        seats.append(seat)
+
+    Seat.objects.bulk_update(seats, ['position'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_unique_seat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seat',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_seat_position'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bus',
+            index=models.Index(fields=['origin', 'destination', 'start_time'], name='bus_route_departure_idx'),
+        ),
+    ]
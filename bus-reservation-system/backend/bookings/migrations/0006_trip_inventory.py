@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_bus_route_departure_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departure_date', models.DateField()),
+                ('is_archived', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TripSeat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_booked', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='booking',
+            name='unique_booking_per_seat',
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='bus',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trips', to='bookings.bus'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='trip',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='bookings.trip'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('trip__isnull', True)), fields=('seat',), name='unique_booking_per_seat'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('trip__isnull', False)), fields=('trip', 'seat'), name='unique_booking_per_trip_seat'),
+        ),
+        migrations.AddField(
+            model_name='tripseat',
+            name='seat',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trip_seats', to='bookings.seat'),
+        ),
+        migrations.AddField(
+            model_name='tripseat',
+            name='trip',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to='bookings.trip'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['departure_date'], name='trip_departure_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trip',
+            constraint=models.UniqueConstraint(fields=('bus', 'departure_date'), name='unique_trip_per_bus_and_date'),
+        ),
+        migrations.AddIndex(
+            model_name='tripseat',
+            index=models.Index(fields=['trip', 'is_booked'], name='tripseat_availability_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tripseat',
+            constraint=models.UniqueConstraint(fields=('trip', 'seat'), name='unique_seat_per_trip'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_trip_inventory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seat',
+            name='held_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='held_seats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='seat',
+            name='held_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tripseat',
+            name='held_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='held_trip_seats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tripseat',
+            name='held_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='seat',
+            index=models.Index(condition=models.Q(('held_until__isnull', False)), fields=['held_until'], name='seat_held_until_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tripseat',
+            index=models.Index(condition=models.Q(('held_until__isnull', False)), fields=['held_until'], name='tripseat_held_until_idx'),
+        ),
+    ]
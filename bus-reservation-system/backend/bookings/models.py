@@ -1,5 +1,7 @@
 from django.db import models # import 'models' to define database models
+from django.utils import timezone # import timezone to default the time an event becomes available to the current time
 from django.contrib.auth.models import User # import 'User' model which is in-built user authentication model that contains fields like username, email, password, etc.
+from .layouts import LAYOUT_CHOICES, DEFAULT_LAYOUT # import seat layout choices to define how seats of a bus are numbered
 
 # Create your models here.
 
@@ -14,6 +16,12 @@ class Bus(models.Model):
     reach_time = models.TimeField() # reach_time is a time field in 12:00:00 format
     no_of_seats = models.PositiveBigIntegerField() # no_of_seats is a positive integer field
     price = models.DecimalField(max_digits=8, decimal_places=2) # price is a decimal field with a maximum of 8 digits and 2 decimal places
+    layout = models.CharField(max_length=20, choices=LAYOUT_CHOICES, default=DEFAULT_LAYOUT) # layout is a character field that decides how seats of the bus are numbered, defaults to 'standard'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['origin', 'destination', 'start_time'], name='bus_route_departure_idx'), # index used to search buses of a route departing within a time window
+        ]
 
     # define a string representation of the model instance
     def __str__(self):
@@ -23,30 +31,165 @@ class Bus(models.Model):
 class Seat(models.Model):
     bus = models.ForeignKey('Bus', on_delete=models.CASCADE, related_name='seats') # bus is a foreign key field that references the 'Bus' model and deletes all associated 'Seat' instances when the referenced 'Bus' instance is deleted
     seat_number = models.CharField(max_length=10) # seat_number is a character field with a maximum length of 10 characters
+    position = models.PositiveIntegerField(default=0) # position is the ordinal of the seat within its bus starting from 0, used to index the seat availability bitmap
     is_booked = models.BooleanField(default=False) # is_booked is a boolean field with a default value of False
+    held_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='held_seats') # held_by is the user holding the seat during checkout, if any
+    held_until = models.DateTimeField(null=True, blank=True) # held_until is the time the hold of the seat expires at, an expired hold does not block anyone
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['held_until'], condition=models.Q(held_until__isnull=False), name='seat_held_until_idx'), # index used to release expired holds
+        ]
 
     # define a string representation of the model instance
     def __str__(self):
         return f"{self.seat_number}"
 
-# create a model 'Booking' that inherits from'models.Model' for model creation and contains the following fields
-class Booking(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE) # user is a foreign key field that references the 'User' model and deletes all associated 'Booking' instances when the referenced 'User' instance is deleted
-    bus = models.ForeignKey(Bus, on_delete=models.CASCADE) # bus is a foreign key field that references the 'Bus' model and deletes all associated 'Booking' instances when the referenced 'Bus' instance is deleted
-    seat = models.ForeignKey(Seat, on_delete=models.CASCADE) # seat is a foreign key field that references the 'Seat' model and deletes all associated 'Booking' instances when the referenced 'Seat' instance is deleted
-    booking_time = models.DateTimeField(auto_now_add=True) # booking_time is a datetime field that automatically sets the current date and time when a new 'Booking' instance is created
+# create a model 'Trip' that inherits from 'models.Model' and represents a departure of a bus on a given date
+# seats are sold per trip, so the same physical seat can be booked once for every date the bus runs
+class Trip(models.Model):
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='trips') # bus is a foreign key field that references the 'Bus' model running the trip
+    departure_date = models.DateField() # departure_date is a date field that stores the date the bus departs on
+    is_archived = models.BooleanField(default=False) # is_archived is a boolean field that is set once seat inventory of a past trip has been removed
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bus', 'departure_date'], name='unique_trip_per_bus_and_date'), # a bus departs at most once a day
+        ]
+        indexes = [
+            models.Index(fields=['departure_date'], name='trip_departure_date_idx'), # index used to find past trips to archive
+        ]
 
+    # define a string representation of the model instance
+    def __str__(self):
+        return f"{self.bus} {self.departure_date}"
+
+# create a model 'TripSeat' that inherits from 'models.Model' and stores whether a seat is booked on a trip
+class TripSeat(models.Model):
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='inventory') # trip is a foreign key field that references the 'Trip' model the seat is sold for
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name='trip_seats') # seat is a foreign key field that references the physical 'Seat' of the bus
+    is_booked = models.BooleanField(default=False) # is_booked is a boolean field with a default value of False
+    held_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='held_trip_seats') # held_by is the user holding the seat during checkout, if any
+    held_until = models.DateTimeField(null=True, blank=True) # held_until is the time the hold of the seat expires at, an expired hold does not block anyone
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['trip', 'seat'], name='unique_seat_per_trip'), # a seat appears once in the inventory of a trip
+        ]
+        indexes = [
+            models.Index(fields=['trip', 'is_booked'], name='tripseat_availability_idx'), # index used to count free seats of a trip
+            models.Index(fields=['held_until'], condition=models.Q(held_until__isnull=False), name='tripseat_held_until_idx'), # index used to release expired holds
+        ]
+
+    # define a string representation of the model instance
+    def __str__(self):
+        return f"{self.trip} {self.seat}"
+
+# create a class that defines what 'Booking' and 'BookingArchive' models show about a booking, so that both are serialized and displayed the same way
+class BookingDetails:
     # define a string representation of the model instance
     def __str__(self):
         return f"{self.user.username}-{self.bus.bus_name}-{self.bus.start_time}-{self.bus.reach_time}-{self.seat.seat_number}"
     
     # define properties called 'price', 'origin', and 'destination' that return the corresponding values from the referenced 'Bus' instance
+    # 'price' is the fare charged when the booking was made, bookings made before fares were recorded fall back to the price of the bus
     @property
     def price(self):
-        return self.bus.price
+        return self.price_paid if self.price_paid is not None else self.bus.price
     @property
     def origin(self):
         return self.bus.origin
     @property
     def destination(self):
-        return self.bus.destination
\ No newline at end of file
+        return self.bus.destination
+    @property
+    def departure_date(self):
+        return self.trip.departure_date if self.trip_id else None
+
+# create a model 'Booking' that inherits from'models.Model' for model creation and contains the following fields
+# bookings of trips that departed are moved to 'BookingArchive' model by 'archive_bookings' command, so this table only holds current bookings
+class Booking(BookingDetails, models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False) # user is a foreign key field that references the 'User' model and deletes all associated 'Booking' instances when the referenced 'User' instance is deleted, looked up by 'booking_user_time_idx'
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE) # bus is a foreign key field that references the 'Bus' model and deletes all associated 'Booking' instances when the referenced 'Bus' instance is deleted
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, db_index=False) # seat is a foreign key field that references the 'Seat' model and deletes all associated 'Booking' instances when the referenced 'Seat' instance is deleted, looked up by 'booking_seat_user_idx'
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, null=True, blank=True, related_name='bookings') # trip is an optional foreign key field that references the 'Trip' the seat was booked for, bookings without a trip use 'Seat.is_booked'
+    booking_time = models.DateTimeField(auto_now_add=True) # booking_time is a datetime field that automatically sets the current date and time when a new 'Booking' instance is created
+    price_paid = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True) # price_paid is a decimal field that stores the fare charged at booking time, empty for bookings made before fares were recorded
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seat'], condition=models.Q(trip__isnull=True), name='unique_booking_per_seat'), # a seat without a trip can be booked by only one booking at a time
+            models.UniqueConstraint(fields=['trip', 'seat'], condition=models.Q(trip__isnull=False), name='unique_booking_per_trip_seat'), # a seat can be booked by only one booking per trip
+        ]
+        indexes = [
+            models.Index(fields=['booking_time'], name='booking_time_idx'), # index used to count recent bookings for analytics
+            models.Index(fields=['user', '-booking_time', '-id'], name='booking_user_time_idx'), # index used to list bookings of a user newest first, replaces the index of 'user' foreign key
+            models.Index(fields=['seat', 'user'], name='booking_seat_user_idx'), # index used to find the booking of a seat to cancel, replaces the index of 'seat' foreign key
+        ]
+
+# create a model 'BookingArchive' that inherits from 'models.Model' and keeps bookings of trips that departed
+# rows keep the id of the booking they were moved from, so moving a batch again after a failure does not copy it twice
+class BookingArchive(BookingDetails, models.Model):
+    id = models.BigIntegerField(primary_key=True) # id is the id the booking had in 'Booking' model, as wide as its 'BigAutoField'
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, related_name='archived_bookings') # user is a foreign key field that references the 'User' who made the booking, looked up by 'bookingarchive_user_time_idx'
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='archived_bookings') # bus is a foreign key field that references the 'Bus' that was booked
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name='archived_bookings') # seat is a foreign key field that references the 'Seat' that was booked
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='archived_bookings') # trip is a foreign key field that references the 'Trip' that departed
+    booking_time = models.DateTimeField() # booking_time is a datetime field that stores when the booking was made
+    price_paid = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True) # price_paid is a decimal field that stores the fare charged at booking time
+    archived_at = models.DateTimeField(auto_now_add=True) # archived_at is a datetime field that stores when the booking was moved to the archive
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-booking_time', '-id'], name='bookingarchive_user_time_idx'), # index used to list archived bookings of a user newest first
+            models.Index(fields=['booking_time'], name='bookingarchive_time_idx'), # index used to count recent bookings for analytics
+        ]
+
+# create a model 'WaitlistEntry' that inherits from 'models.Model' and queues a user for a seat of a sold out bus or trip
+# when a booking of the bus or trip is cancelled, the seat goes straight to the entry at the head of the queue
+class WaitlistEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries') # user is a foreign key field that references the 'User' waiting for a seat
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='waitlist') # bus is a foreign key field that references the 'Bus' the user waits for
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, null=True, blank=True, related_name='waitlist') # trip is an optional foreign key field that references the 'Trip' the user waits for
+    priority = models.SmallIntegerField(default=0) # priority is an integer field, entries with higher priority are served first and entries with equal priority in the order they joined
+    created_at = models.DateTimeField(auto_now_add=True) # created_at is a datetime field that stores when the user joined the waitlist
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry') # booking is the booking the entry was promoted to, empty while the user is waiting
+    promoted_at = models.DateTimeField(null=True, blank=True) # promoted_at is a datetime field that stores when the entry got its seat
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'bus'], condition=models.Q(trip__isnull=True, promoted_at__isnull=True), name='unique_waiting_entry_per_bus'), # a user waits once for a bus
+            models.UniqueConstraint(fields=['user', 'trip'], condition=models.Q(trip__isnull=False, promoted_at__isnull=True), name='unique_waiting_entry_per_trip'), # a user waits once for a trip
+        ]
+        indexes = [
+            models.Index(fields=['bus', 'trip', '-priority', 'created_at'], condition=models.Q(promoted_at__isnull=True), name='waitlist_queue_idx'), # index used to find the head of a waitlist
+        ]
+
+    # define a string representation of the model instance
+    def __str__(self):
+        return f"{self.user.username}-{self.bus.bus_name}-{self.trip_id}"
+
+# create a model 'BookingEvent' that inherits from 'models.Model' and acts as an outbox of booking events for downstream consumers
+# events are written in the same transaction as the booking they describe, so an event exists if and only if its booking change was committed
+class BookingEvent(models.Model):
+    CREATED = 'booking.created' # kind of event recorded when a booking is made
+    CANCELLED = 'booking.cancelled' # kind of event recorded when a booking is cancelled
+    KIND_CHOICES = [(CREATED, 'Booking created'), (CANCELLED, 'Booking cancelled')]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES) # kind is a character field that stores what happened to the booking
+    payload = models.JSONField() # payload is a JSON field that stores ids of the booking, user, bus, seat and trip
+    created_at = models.DateTimeField(auto_now_add=True) # created_at is a datetime field that stores when the event was recorded
+    available_at = models.DateTimeField(default=timezone.now) # available_at is a datetime field that stores when the event can be picked by a worker, pushed forward while a worker holds it or after a failure
+    locked_by = models.CharField(max_length=64, blank=True) # locked_by is a character field that stores the worker currently delivering the event
+    attempts = models.PositiveSmallIntegerField(default=0) # attempts is an integer field that counts failed deliveries
+    last_error = models.TextField(blank=True) # last_error is a text field that stores the error of the last failed delivery
+    processed_at = models.DateTimeField(null=True, blank=True) # processed_at is a datetime field that stores when the event was delivered to every consumer
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at'], condition=models.Q(processed_at__isnull=True), name='bookingevent_pending_idx'), # index used by workers to find pending events
+        ]
+
+    # define a string representation of the model instance
+    def __str__(self):
+        return f"{self.kind} {self.payload}"
\ No newline at end of file
@@ -0,0 +1,21 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination # import CursorPagination and PageNumberPagination to split long lists into pages
+
+# create a pagination class that inherits from 'PageNumberPagination' and only paginates when the client asks for a page
+# clients that send neither 'page' nor 'page_size' keep receiving a plain list, which is what the frontend expects
+class OptionalPageNumberPagination(PageNumberPagination):
+    page_size = 20 # number of items in a page when 'page_size' is not sent
+    page_size_query_param = 'page_size' # query parameter used by clients to choose the number of items in a page
+    max_page_size = 100 # maximum number of items a client can ask for in a page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params and self.page_size_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+# create a pagination class that inherits from 'CursorPagination' to page through search results by departure time
+# a cursor continues right after the last bus of the previous page, so later pages cost the same as the first one
+class BusSearchPagination(CursorPagination):
+    page_size = 20 # number of buses in a page when 'page_size' is not sent
+    page_size_query_param = 'page_size' # query parameter used by clients to choose the number of buses in a page
+    max_page_size = 100 # maximum number of buses a client can ask for in a page
+    ordering = ('start_time', 'id') # order buses by departure time, 'id' keeps the order stable for buses departing at the same time
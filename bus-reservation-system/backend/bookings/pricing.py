@@ -0,0 +1,67 @@
+import math # import math to round load thresholds up to whole seats
+from bisect import bisect_right # import bisect_right to find the fare tier of a number of booked seats
+from decimal import Decimal # import Decimal to compute fares without rounding errors
+
+from django.conf import settings # import settings to read fare tiers
+from django.core.cache import cache # import cache to keep precomputed fare tiers of every bus
+from django.utils import timezone # import timezone to get today's date
+from .models import Bus # import Bus model to read the base price of a bus
+from . import availability # import availability to read how many seats are booked from the cached seat bitmap
+
+CACHE_TIMEOUT = 3600 # seconds fare tiers of a bus stay cached, they are dropped right away when the bus changes
+
+# fare multipliers by load factor, a tier applies once at least that share of seats is booked
+LOAD_TIERS = getattr(settings, 'FARE_LOAD_TIERS', [(0, '1.00'), (0.5, '1.10'), (0.75, '1.25'), (0.9, '1.50')])
+
+# fare multipliers by time to departure, a tier applies when the trip departs within that many days, the first matching tier wins
+DEPARTURE_TIERS = getattr(settings, 'FARE_DEPARTURE_TIERS', [(1, '1.20'), (3, '1.10')])
+
+# create a function that returns the cache key of the fare tiers of a bus
+def _cache_key(bus_id):
+    return f'bookings:fares:{bus_id}'
+
+# create a function that computes the fare tiers of a bus as two lists, the numbers of booked seats at which every tier starts and the fare of every tier
+def _build(bus):
+    thresholds = [math.ceil(min_load * bus.no_of_seats) for min_load, multiplier in LOAD_TIERS]
+    fares = [bus.price * Decimal(multiplier) for min_load, multiplier in LOAD_TIERS]
+    return thresholds, fares
+
+# create a function that returns the fare tiers of a bus, or None if the bus does not exist
+# 'bus' can be passed when it is already loaded so that a cache miss does not query it again
+def get_tiers(bus_id, bus=None):
+    tiers = cache.get(_cache_key(bus_id))
+
+    if tiers is None:
+        bus = bus or Bus.objects.filter(id=bus_id).only('price', 'no_of_seats').first()
+        if bus is None:
+            return None
+        tiers = _build(bus)
+        cache.set(_cache_key(bus_id), tiers, CACHE_TIMEOUT)
+
+    return tiers
+
+# create a function that drops the fare tiers of a bus, called when its price or seats change
+def invalidate(bus_id):
+    cache.delete(_cache_key(bus_id))
+
+# create a function that returns the multiplier for a trip departing on 'departure_date', bookings without a trip have no departure date and no surcharge
+def _departure_multiplier(departure_date):
+    if departure_date is not None:
+        days = (departure_date - timezone.localdate()).days
+        for max_days, multiplier in DEPARTURE_TIERS:
+            if days <= max_days:
+                return Decimal(multiplier)
+    return Decimal(1)
+
+# create a function that returns the current fare of a seat of a bus, or of its trip when 'trip' is given, or None if the bus does not exist
+# the number of booked seats is read from the cached seat bitmap, which the booking engine updates in place as seats are booked and freed, so quoting a fare does not count seats in the database
+def quote(bus_id, trip=None, bus=None):
+    tiers = get_tiers(bus_id, bus)
+    seats = availability.get_trip_availability(bus_id, trip)
+    if tiers is None or seats is None:
+        return None
+
+    thresholds, fares = tiers
+    booked = seats[0] - availability.count_available(*seats)
+    fare = fares[max(bisect_right(thresholds, booked) - 1, 0)] * _departure_multiplier(trip and trip.departure_date)
+    return fare.quantize(Decimal('0.01'))
@@ -1,6 +1,9 @@
 from rest_framework import serializers # import serializers module from rest_framework to serialize the data
-from .models import Bus, Seat, Booking # import models from models.py
+from django.db import transaction # import transaction to create many buses and their seats in a single atomic write
+from django.db.models import prefetch_related_objects # import prefetch_related_objects to load seats of many buses with a single query
+from .models import Bus, Seat, Booking, WaitlistEntry # import models from models.py
 from django.contrib.auth.models import User  # import User model that contains user authentication related fields like username, email, password, etc.
+from .signals import create_seats_for_buses # import create_seats_for_buses to insert seats of many buses in one batch
 
 # create a serializer named 'UserRegisterSerializer' that inherits from 'ModelSerializer' class
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -27,7 +30,25 @@ class SeatSerializer(serializers.ModelSerializer):
     # create a Meta class that defines the model and it's rows to serialize
     class Meta:
         model = Seat # Seat model will be serialized by this seializer
-        fields = ['id','seat_number', 'is_booked'] # 'id','seat_number', 'is_booked' fields will be serialized by this serializer
+        fields = ['id','seat_number', 'position', 'is_booked'] # 'id','seat_number', 'position', 'is_booked' fields will be serialized by this serializer
+
+# create a serializer named 'BusBulkSerializer' that is used by 'BusSerializer' when a list of buses is sent in a single request
+class BusBulkSerializer(serializers.ListSerializer):
+    # reject lists that repeat a bus number since they would fail only after reaching the database
+    def validate(self, attrs):
+        numbers = [item['number'] for item in attrs]
+        if len(numbers) != len(set(numbers)):
+            raise serializers.ValidationError('Bus numbers must be unique within a request')
+        return attrs
+
+    # insert all buses with a single INSERT and all of their seats with one batched write instead of one 'post_save' signal per bus
+    def create(self, validated_data):
+        with transaction.atomic():
+            buses = Bus.objects.bulk_create([Bus(**item) for item in validated_data])
+            create_seats_for_buses(buses)
+
+        prefetch_related_objects(buses, 'seats') # load seats of all buses with one query so that the response does not query once per bus
+        return buses
 
 # create a serializer named 'BusSerializer' that inherits from 'ModelSerializer' class
 class BusSerializer(serializers.ModelSerializer):
@@ -37,6 +58,16 @@ class BusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bus
         fields = '__all__'
+        list_serializer_class = BusBulkSerializer # serialize lists of buses with 'BusBulkSerializer' so that they are created in bulk
+
+# create a serializer named 'BusImportSerializer' that validates a row of a bus import file
+# 'number' is not checked for uniqueness since rows of existing buses update them instead
+class BusImportSerializer(serializers.ModelSerializer):
+    # create a Meta class that defines the model and it's rows to serialize
+    class Meta:
+        model = Bus
+        exclude = ['id']
+        extra_kwargs = {'number': {'validators': []}}
 
 class BusSummarySerializer(serializers.ModelSerializer):
     # create a Meta class that defines the model and it's rows to serialize
@@ -44,6 +75,36 @@ class BusSummarySerializer(serializers.ModelSerializer):
         model = Bus
         fields = ['bus_name', 'number', 'origin', 'destination']
 
+# create a serializer named 'BusListSummarySerializer' that lists a bus with seat counts instead of every seat
+# 'total_seats' and 'available_seats' are computed by the database with aggregation, see 'BusListCreateView'
+class BusListSummarySerializer(serializers.ModelSerializer):
+    total_seats = serializers.IntegerField(read_only=True) # number of seats of the bus
+    available_seats = serializers.IntegerField(read_only=True) # number of seats of the bus that are not booked
+
+    # create a Meta class that defines the model and it's rows to serialize
+    class Meta:
+        model = Bus
+        fields = ['id', 'bus_name', 'number', 'origin', 'destination', 'start_time', 'reach_time', 'price', 'layout', 'total_seats', 'available_seats']
+
+# create a serializer named 'BusSearchSerializer' that validates query parameters of a bus search
+class BusSearchSerializer(serializers.Serializer):
+    origin = serializers.CharField(required=False) # city the bus departs from
+    destination = serializers.CharField(required=False) # city the bus reaches
+    depart_after = serializers.TimeField(required=False) # earliest departure time
+    depart_before = serializers.TimeField(required=False) # latest departure time
+    min_price = serializers.DecimalField(max_digits=8, decimal_places=2, required=False) # lowest fare
+    max_price = serializers.DecimalField(max_digits=8, decimal_places=2, required=False) # highest fare
+    min_seats = serializers.IntegerField(min_value=1, required=False) # minimum number of free seats
+
+# create a serializer named 'BookingFilterSerializer' that validates query parameters filtering bookings of a user
+class BookingFilterSerializer(serializers.Serializer):
+    booked_after = serializers.DateField(required=False) # earliest date the booking was made on
+    booked_before = serializers.DateField(required=False) # latest date the booking was made on
+
+# create a serializer named 'AnalyticsFilterSerializer' that validates query parameters of analytics
+class AnalyticsFilterSerializer(serializers.Serializer):
+    hours = serializers.IntegerField(min_value=1, max_value=168, default=24) # number of past hours to count bookings per hour for
+
 # create a serializer named 'BookingSerializer' that inherits from 'ModelSerializer' class
 class BookingSerializer(serializers.ModelSerializer):
     bus = BusSummarySerializer(read_only=True) # create an instance of 'BusSummarySerializer' class that can be read only
@@ -52,9 +113,18 @@ class BookingSerializer(serializers.ModelSerializer):
     price = serializers.StringRelatedField() # create a field named 'price' that will store string
     origin = serializers.StringRelatedField() # create a field named 'origin' that will store string
     destination = serializers.StringRelatedField() # create a field named 'destination' that will store string
+    departure_date = serializers.DateField(read_only=True) # create a field named 'departure_date' that stores the date of the trip, null for bookings without a trip
 
     # create a Meta class that defines the model and it's rows to serialize
     class Meta:
         model = Booking # Booking model will be serialized by this seializer
         fields = '__all__' # '__all__' means that all the fields of the model will be serialized by this serializer
-        read_only_fields = ['user', 'booking_time', 'bus', 'seat', 'price','origin','destination'] # these fields will be read only
\ No newline at end of file
+        read_only_fields = ['user', 'booking_time', 'bus', 'seat', 'trip', 'price_paid', 'price','origin','destination'] # these fields will be read only
+
+# create a serializer named 'WaitlistEntrySerializer' that inherits from 'ModelSerializer' class
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    # create a Meta class that defines the model and it's rows to serialize
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'bus', 'trip', 'priority', 'created_at', 'booking', 'promoted_at']
+        read_only_fields = fields
\ No newline at end of file
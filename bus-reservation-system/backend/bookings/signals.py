@@ -1,10 +1,57 @@
-from django.db.models.signals import post_save # import post_save signal which is triggered when a model instance is saved to the model
+from django.db import transaction # import transaction to insert all seats of a bus in a single atomic write
+from django.db.models.signals import post_save, post_delete # import post_save and post_delete signals which are triggered when a model instance is saved to or deleted from the model
 from django.dispatch import receiver # import receiver which is used to connect a function to a signal
+from django.contrib.auth.models import User # import User model to drop cached tokens of a changed user
+from rest_framework.authtoken.models import Token # import Token model to drop cached tokens that are deleted
 from .models import Bus, Seat # import Bus and Seat model
+from .authentication import forget_token # import forget_token to drop a token from the token caches
+from .layouts import seat_numbers # import seat_numbers to get the precomputed seat numbers of a layout
+from . import availability # import availability to drop the cached seat bitmap and move the version of a changed bus
+from . import pricing # import pricing to drop fare tiers of a changed bus
+
+SEAT_BATCH_SIZE = 1000 # maximum number of seats inserted by a single INSERT statement
+
+# create a function that inserts the seats of all given buses with one batched and transactional write and returns the number of seats inserted
+# this is used directly by code paths that create many buses at once (like bulk creation and imports) since 'bulk_create' does not send 'post_save' signal
+def create_seats_for_buses(buses):
+    seats = [
+        Seat(bus=bus, seat_number=number, position=position)
+        for bus in buses
+        for position, number in enumerate(seat_numbers(bus.layout, bus.no_of_seats))
+    ]
+
+    with transaction.atomic():
+        Seat.objects.bulk_create(seats, batch_size=SEAT_BATCH_SIZE)
+
+    return len(seats)
 
 @receiver(post_save, sender=Bus) # this function receives post_save signal from 'Bus' model
 def create_seats_for_bus(sender, instance, created, **kwargs):
     if created: # if a new record is created in the 'Bus' model
         # insert all seats of the newly created and inserted bus records in the 'Seat' model
-        for i in range(1, instance.no_of_seats + 1):
-            Seat.objects.create(bus=instance, seat_number= f"S{i}")
\ No newline at end of file
+        create_seats_for_buses([instance])
+
+    else: # an existing bus is updated, so its cached details and fares must not be served any more
+        availability.bump_version(instance.pk)
+        pricing.invalidate(instance.pk)
+
+@receiver(post_save, sender=Seat) # this function receives post_save signal from 'Seat' model, sent when a seat is edited outside the booking engine (like from admin)
+def drop_seat_availability(sender, instance, created, **kwargs):
+    if not created:
+        availability.invalidate(instance.bus_id)
+
+@receiver(post_delete, sender=Bus) # this function receives post_delete signal from 'Bus' model
+def drop_bus_availability(sender, instance, **kwargs):
+    availability.invalidate(instance.pk) # the cached seat bitmap of a deleted bus must not be served any more
+    pricing.invalidate(instance.pk)
+
+@receiver(post_delete, sender=Token) # this function receives post_delete signal from 'Token' model, sent on logout and when a token is rotated
+def drop_deleted_token(sender, instance, **kwargs):
+    forget_token(instance.key) # a deleted token must stop authenticating right away
+
+@receiver(post_save, sender=User) # this function receives post_save signal from 'User' model
+def drop_tokens_of_changed_user(sender, instance, created, **kwargs):
+    # cached tokens hold a copy of the user, so drop them when the user changes (like being deactivated) and let the next request read the user again
+    if not created:
+        for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+            forget_token(key)
@@ -1,3 +1,760 @@
-from django.test import TestCase
+import base64 # import base64 to decode the seat availability bitmap
+import io # import io to capture output of management commands
+import json # import json to decode events of the seat map stream
+import tempfile # import tempfile to write files to import
+import threading # import threading to start concurrent booking requests at the same moment
+from unittest import mock, skipUnless # import mock to replace the admission limiter of the booking view and skipUnless to skip tests of a per-process cache
+from concurrent.futures import ThreadPoolExecutor # import ThreadPoolExecutor to drive many booking requests with a fixed number of threads
+from datetime import timedelta # import timedelta to compute departure dates of trips
 
-# Create your tests here.
+from asgiref.sync import sync_to_async # import sync_to_async to book seats from async tests
+from django.conf import settings # import settings to check the configured cache
+from django.contrib.auth.models import User # import User model to create the users who book seats
+from django.core.management import call_command # import call_command to run management commands
+from django.core.files.uploadedfile import SimpleUploadedFile # import SimpleUploadedFile to upload files to import
+from django.core.cache import cache # import cache to start every test without cached seat bitmaps
+from django.db import connection # import connection to close the database connection opened by every worker thread
+from django.db.models import QuerySet # import QuerySet to replay a booking read by a concurrent request
+from django.utils import timezone # import timezone to get today's date
+from django.test import TestCase, TransactionTestCase, override_settings # import TransactionTestCase since worker threads must see committed data
+from rest_framework.authtoken.models import Token # import Token to authenticate API requests
+from rest_framework.test import APIClient # import APIClient to call the booking API
+
+from .engine import book_seat, book_seats, cancel_booking, get_trip, hold_seat, release_hold, join_waitlist, BookingError, BookingNotFound, SeatAlreadyBooked, SeatHeld, HoldNotFound, TripDeparted # import the booking engine
+from .benchmark import summarize, compare # import summarize and compare to check benchmark reports
+from .archive import archive_bookings # import archive_bookings to move bookings of departed trips
+from .importer import import_buses # import import_buses to import buses from streams
+from . import authentication # import authentication to check lifetime of cached tokens
+from . import availability # import availability to replay bitmaps cached by slow requests
+from . import pricing # import pricing to quote fares
+from . import throttling # import throttling to reset rate limits and limit concurrent bookings
+from .views import BookingView # import BookingView to limit its concurrent requests
+from .events import drain, get_consumers # import drain and get_consumers to deliver booking events
+from .models import Bus, Seat, Trip, TripSeat, Booking, BookingArchive, BookingEvent, WaitlistEntry # import the models
+
+# create a helper that creates a bus with given number of seats
+def create_bus(number='B1', no_of_seats=4):
+    return Bus.objects.create(
+        bus_name='Express', number=number, origin='Pune', destination='Goa', features='AC',
+        start_time='10:00', reach_time='18:00', no_of_seats=no_of_seats, price='500.00',
+    )
+
+# load test of the booking engine, every test is run against the configured database (SQLite by default, PostgreSQL when 'POSTGRES_DB' is set)
+class ConcurrentBookingTests(TransactionTestCase):
+    THREADS = 16 # number of concurrent clients
+    ATTEMPTS = 400 # number of booking requests sent during the flash sale
+
+    def setUp(self):
+        self.bus = create_bus(no_of_seats=8)
+        self.seat_ids = list(self.bus.seats.values_list('id', flat=True))
+        self.users = [User.objects.create(username=f'user{i}') for i in range(self.THREADS)]
+
+    # create a helper that books a seat from a worker thread and returns whether it succeeded
+    def attempt(self, user, seat_id, barrier=None):
+        try:
+            if barrier:
+                barrier.wait()
+            book_seat(user, seat_id)
+            return True
+        except BookingError:
+            return False
+        finally:
+            connection.close() # every thread opens its own connection which has to be closed before the test database is flushed
+
+    def test_only_one_request_books_a_contended_seat(self):
+        barrier = threading.Barrier(self.THREADS)
+        seat_id = self.seat_ids[0]
+
+        with ThreadPoolExecutor(self.THREADS) as pool:
+            results = list(pool.map(lambda user: self.attempt(user, seat_id, barrier), self.users))
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Booking.objects.filter(seat_id=seat_id).count(), 1)
+
+    def test_flash_sale_never_double_books(self):
+        requests = [(self.users[i % self.THREADS], self.seat_ids[i % len(self.seat_ids)]) for i in range(self.ATTEMPTS)]
+
+        with ThreadPoolExecutor(self.THREADS) as pool:
+            results = list(pool.map(lambda request: self.attempt(*request), requests))
+
+        self.assertEqual(results.count(True), len(self.seat_ids))
+        self.assertEqual(Booking.objects.count(), len(self.seat_ids))
+        self.assertEqual(Booking.objects.values('seat').distinct().count(), len(self.seat_ids))
+        self.assertFalse(Seat.objects.filter(is_booked=False).exists())
+
+# tests of the booking endpoints
+class BookingViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bus = create_bus()
+        self.seat = self.bus.seats.first()
+        self.user = User.objects.create(username='alice')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def test_booking_a_booked_seat_returns_conflict(self):
+        self.assertEqual(self.client.post('/api/booking/', {'seat': self.seat.id}).status_code, 201)
+
+        response = self.client.post('/api/booking/', {'seat': self.seat.id})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error'], SeatAlreadyBooked.message)
+
+    def test_booking_an_invalid_seat_returns_bad_request(self):
+        self.assertEqual(self.client.post('/api/booking/', {'seat': 'abc'}).status_code, 400)
+
+    def test_cancelling_frees_the_seat(self):
+        self.client.post('/api/booking/', {'seat': self.seat.id})
+
+        self.assertEqual(self.client.delete(f'/api/booking/{self.seat.id}/').status_code, 204)
+        self.seat.refresh_from_db()
+        self.assertFalse(self.seat.is_booked)
+        self.assertEqual(self.client.delete(f'/api/booking/{self.seat.id}/').status_code, 404)
+
+    def test_batch_booking_books_all_seats_with_fixed_queries(self):
+        seat_ids = list(self.bus.seats.values_list('id', flat=True))
+        self.client.get(f'/api/buses/{self.bus.id}/availability/') # cache the token, the seat bitmap and fares, which the fare of the booking is quoted from
+
+        with self.assertNumQueries(6): # load seats, savepoint, claim, insert bookings, insert events, release savepoint
+            response = self.client.post('/api/booking/batch/', {'bus': self.bus.id, 'seats': seat_ids}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), len(seat_ids))
+        self.assertFalse(Seat.objects.filter(is_booked=False).exists())
+
+    def test_batch_booking_books_nothing_when_a_seat_is_taken(self):
+        seat_ids = list(self.bus.seats.values_list('id', flat=True))
+        self.client.post('/api/booking/', {'seat': seat_ids[-1]})
+
+        response = self.client.post('/api/booking/batch/', {'bus': self.bus.id, 'seats': seat_ids}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(Seat.objects.filter(is_booked=True).count(), 1)
+
+    def test_availability_is_served_from_cache_and_follows_bookings(self):
+        self.client.get(f'/api/buses/{self.bus.id}/availability/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/booking/', {'seat': self.seat.id})
+
+        with self.assertNumQueries(0):
+            response = APIClient().get(f'/api/buses/{self.bus.id}/availability/') # anonymous client so that no token is looked up
+
+        self.assertEqual(response.data['no_of_seats'], 4)
+        self.assertEqual(response.data['available'], 3)
+        self.assertEqual(base64.b64decode(response.data['booked']), bytes([1 << self.seat.position]))
+
+    def test_batch_booking_of_an_invalid_bus_returns_bad_request(self):
+        response = self.client.post('/api/booking/batch/', {'bus': 'abc', 'seats': [self.seat.id]}, format='json')
+        self.assertEqual((response.status_code, response.data['error']), (400, 'Invalid Bus ID'))
+
+    def test_bitmap_read_before_a_booking_is_not_served_after_it(self):
+        version = availability.get_version(self.bus.id) # a slow request reads the version and the free seats before the booking commits
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/booking/', {'seat': self.seat.id})
+        cache.set(f'bookings:availability:{self.bus.id}', (version, 4, bytes(1))) # and caches them after the booking was marked
+
+        self.assertEqual(APIClient().get(f'/api/buses/{self.bus.id}/availability/').data['available'], 3)
+
+# tests of the bus listing
+class BusListViewTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            create_bus(number=f'B{i}')
+        Seat.objects.filter(position=0).update(is_booked=True)
+
+    def test_listing_costs_constant_queries(self):
+        with self.assertNumQueries(2): # buses, seats of all buses
+            response = self.client.get('/api/buses/')
+        self.assertEqual(len(response.json()), 5)
+
+    def test_summary_mode_counts_seats_in_the_database(self):
+        with self.assertNumQueries(2): # count for the page, page of buses with seat counts
+            response = self.client.get('/api/buses/', {'summary': 'true', 'page_size': 2})
+
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['results']), 2)
+        self.assertNotIn('seats', data['results'][0])
+        self.assertEqual((data['results'][0]['total_seats'], data['results'][0]['available_seats']), (4, 3))
+
+    def test_search_filters_route_window_and_free_seats(self):
+        create_bus(number='late')
+        create_bus(number='other')
+        Bus.objects.filter(number='late').update(start_time='22:00')
+        Bus.objects.filter(number='other').update(destination='Delhi')
+
+        response = self.client.get('/api/buses/search/', {'origin': 'Pune', 'destination': 'Goa', 'depart_before': '12:00', 'min_seats': 3, 'page_size': 4})
+        data = response.json()
+        self.assertEqual([bus['number'] for bus in data['results']], ['B0', 'B1', 'B2', 'B3'])
+        self.assertIsNotNone(data['next'])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([bus['number'] for bus in data['results']], ['B4'])
+
+    def test_bulk_creation_seats_every_bus_in_one_write(self):
+        buses = [
+            {'bus_name': 'Express', 'number': f'N{i}', 'origin': 'Pune', 'destination': 'Goa', 'features': 'AC', 'start_time': '10:00', 'reach_time': '18:00', 'no_of_seats': 5, 'price': '500.00', 'layout': layout}
+            for i, layout in enumerate(['standard', '2x2_seater', '2x1_sleeper'])
+        ]
+        with self.assertNumQueries(len(buses) + 7): # a uniqueness check per number, then one insert of the buses and one of all their seats inside two savepoints, and seats of the response
+            response = self.client.post('/api/buses/', buses, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+        seats = {bus['number']: [seat['seat_number'] for seat in sorted(bus['seats'], key=lambda seat: seat['position'])] for bus in response.json()}
+        self.assertEqual(seats, {
+            'N0': ['S1', 'S2', 'S3', 'S4', 'S5'],
+            'N1': ['1A', '1B', '1C', '1D', '2A'],
+            'N2': ['SL1A', 'SL1B', 'SL1C', 'SL2A', 'SL2B'],
+        })
+        self.assertEqual(
+            list(Seat.objects.filter(bus__number='N2').order_by('position').values_list('position', 'seat_number', 'is_booked')),
+            [(0, 'SL1A', False), (1, 'SL1B', False), (2, 'SL1C', False), (3, 'SL2A', False), (4, 'SL2B', False)]
+        )
+        self.assertEqual(Seat.objects.filter(bus__number__startswith='N').count(), 15)
+
+    def test_search_rejects_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/buses/search/', {'depart_after': 'noon'}).status_code, 400)
+
+# tests of seats sold per trip
+class TripBookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bus = create_bus()
+        self.seat = self.bus.seats.first()
+        self.tomorrow = timezone.localdate() + timedelta(days=1)
+        self.users = [User.objects.create(username=f'user{i}') for i in range(2)]
+
+    def test_a_seat_is_sold_once_per_trip(self):
+        book_seat(self.users[0], self.seat.id, self.tomorrow)
+        book_seat(self.users[1], self.seat.id, self.tomorrow + timedelta(days=1))
+
+        with self.assertRaises(SeatAlreadyBooked):
+            book_seat(self.users[1], self.seat.id, self.tomorrow)
+
+        self.seat.refresh_from_db()
+        self.assertFalse(self.seat.is_booked)
+        self.assertEqual(Trip.objects.filter(bus=self.bus).count(), 2)
+
+    def test_cancelling_frees_the_seat_of_the_trip_only(self):
+        book_seat(self.users[0], self.seat.id, self.tomorrow)
+        book_seat(self.users[0], self.seat.id, self.tomorrow + timedelta(days=1))
+
+        cancel_booking(self.users[0], self.seat.id, self.tomorrow)
+
+        self.assertEqual(list(TripSeat.objects.filter(seat=self.seat, is_booked=True).values_list('trip__departure_date', flat=True)), [self.tomorrow + timedelta(days=1)])
+
+    def test_past_trips_can_not_be_booked_and_are_archived(self):
+        with self.assertRaises(BookingError):
+            book_seat(self.users[0], self.seat.id, timezone.localdate() - timedelta(days=1))
+
+        trip = get_trip(self.bus.id, self.tomorrow)
+        Trip.objects.filter(id=trip.id).update(departure_date=timezone.localdate() - timedelta(days=2))
+        call_command('archive_trips', stdout=io.StringIO())
+
+        self.assertFalse(TripSeat.objects.exists())
+        self.assertTrue(Trip.objects.get(id=trip.id).is_archived)
+
+    def test_looking_at_a_date_does_not_create_its_trip(self):
+        response = APIClient().get(f'/api/buses/{self.bus.id}/availability/?date={self.tomorrow}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['trip'], response.json()['available'], response.json()['fare']), (None, 4, 600.0)) # departs within a day
+        self.assertFalse(Trip.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(self.users[0], self.seat.id, self.tomorrow)
+        self.assertEqual(APIClient().get(f'/api/buses/{self.bus.id}/availability/?date={self.tomorrow}').json()['available'], 3)
+
+    def test_invalidating_a_bus_drops_bitmaps_of_its_trips(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(self.users[0], self.seat.id, self.tomorrow)
+        self.assertEqual(APIClient().get(f'/api/buses/{self.bus.id}/availability/?date={self.tomorrow}').json()['available'], 3)
+
+        TripSeat.objects.update(is_booked=False) # seats freed outside the booking engine
+        availability.invalidate(self.bus.id)
+
+        self.assertEqual(APIClient().get(f'/api/buses/{self.bus.id}/availability/?date={self.tomorrow}').json()['available'], 4)
+
+    def test_dates_beyond_the_booking_horizon_are_rejected(self):
+        with mock.patch('bookings.engine.BOOKING_HORIZON', timedelta(days=30)):
+            response = APIClient().get(f'/api/buses/{self.bus.id}/availability/?date={timezone.localdate() + timedelta(days=31)}')
+            self.assertEqual(response.status_code, 400)
+            with self.assertRaises(BookingError):
+                book_seat(self.users[0], self.seat.id, timezone.localdate() + timedelta(days=31))
+        self.assertFalse(Trip.objects.exists())
+
+# tests of seat holds during checkout
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seat = create_bus().seats.first()
+        self.users = [User.objects.create(username=f'user{i}') for i in range(2)]
+
+    def test_a_held_seat_can_only_be_booked_by_its_holder(self):
+        hold_seat(self.users[0], self.seat.id)
+
+        with self.assertRaises(SeatHeld):
+            hold_seat(self.users[1], self.seat.id)
+        with self.assertRaises(SeatHeld):
+            book_seat(self.users[1], self.seat.id)
+
+        book_seat(self.users[0], self.seat.id)
+        self.seat.refresh_from_db()
+        self.assertEqual((self.seat.is_booked, self.seat.held_by, self.seat.held_until), (True, None, None))
+
+    def test_an_expired_hold_does_not_block_the_seat(self):
+        hold_seat(self.users[0], self.seat.id)
+        Seat.objects.filter(id=self.seat.id).update(held_until=timezone.now() - timedelta(seconds=1))
+
+        book_seat(self.users[1], self.seat.id)
+
+        with self.assertRaises(HoldNotFound):
+            release_hold(self.users[0], self.seat.id)
+
+    def test_expired_holds_are_swept(self):
+        hold_seat(self.users[0], self.seat.id)
+        Seat.objects.filter(id=self.seat.id).update(held_until=timezone.now() - timedelta(seconds=1))
+
+        call_command('release_expired_holds', stdout=io.StringIO())
+        self.assertFalse(Seat.objects.filter(held_by__isnull=False).exists())
+
+# tests of listing bookings of a user
+class UserBookingViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            bus = create_bus(number=f'B{i}')
+            book_seats(self.user, bus.id, list(bus.seats.values_list('id', flat=True)))
+            book_seat(self.user, bus.seats.first().id, timezone.localdate() + timedelta(days=1))
+
+    def test_listing_bookings_costs_constant_queries(self):
+        with self.assertNumQueries(2): # current and archived bookings joined with bus, seat, trip and user
+            response = self.client.get(f'/api/user/{self.user.id}/bookings/')
+        self.assertEqual(len(response.data), 15)
+
+        with self.assertNumQueries(3): # count of current and archived bookings, page of bookings
+            response = self.client.get(f'/api/user/{self.user.id}/bookings/', {'page_size': 5, 'page': 2})
+        self.assertEqual((response.data['count'], len(response.data['results'])), (15, 5))
+
+    def test_archived_bookings_are_read_through(self):
+        self.assertEqual(archive_bookings(timezone.localdate() + timedelta(days=1), batch_size=2), 3)
+        self.assertEqual((Booking.objects.count(), BookingArchive.objects.count()), (12, 3))
+
+        with self.assertNumQueries(4): # count of current and archived bookings, end of current bookings, start of archived bookings
+            response = self.client.get(f'/api/user/{self.user.id}/bookings/', {'page_size': 5, 'page': 3})
+        results = response.data['results']
+        self.assertEqual((response.data['count'], len(results)), (15, 5))
+        self.assertEqual([booking['departure_date'] is not None for booking in results], [False, False, True, True, True])
+
+    def test_bookings_can_be_filtered_by_date(self):
+        Booking.objects.filter(trip__isnull=False).update(booking_time=timezone.now() - timedelta(days=10))
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+
+        self.assertEqual(len(self.client.get(f'/api/user/{self.user.id}/bookings/', {'booked_after': since}).data), 12)
+        self.assertEqual(len(self.client.get(f'/api/user/{self.user.id}/bookings/', {'booked_before': since}).data), 3)
+        self.assertEqual(self.client.get(f'/api/user/{self.user.id}/bookings/', {'booked_after': 'yesterday'}).status_code, 400)
+
+# tests of fare and inventory analytics
+class AnalyticsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='ops', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        buses = [create_bus(number=f'B{i}') for i in range(2)]
+        book_seats(self.user, buses[0].id, list(buses[0].seats.values_list('id', flat=True))[:2])
+        book_seat(self.user, buses[1].seats.first().id, timezone.localdate() + timedelta(days=1))
+        get_trip(buses[1].id, timezone.localdate() + timedelta(days=2))
+
+    def test_analytics_are_aggregated_and_cached(self):
+        with self.assertNumQueries(3): # bookings and trips per bus, current and archived bookings per hour
+            data = self.client.get('/api/analytics/').data
+
+        self.assertEqual([(bus['bookings'], bus['capacity'], bus['load_factor']) for bus in data['buses']], [(2, 4, 0.5), (1, 8, 0.125)])
+        self.assertEqual(len(data['routes']), 1)
+        self.assertEqual((data['routes'][0]['bookings'], str(data['routes'][0]['revenue'])), (3, '1600.00')) # the seat of the trip departing tomorrow is charged 20% more
+        self.assertEqual(sum(hour['bookings'] for hour in data['bookings_per_hour']), 3)
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/analytics/')
+
+    def test_analytics_are_staff_only(self):
+        self.client.force_authenticate(User.objects.create(username='alice'))
+        self.assertEqual(self.client.get('/api/analytics/').status_code, 403)
+
+# tests of cached token authentication
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bus = create_bus()
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.client = APIClient()
+
+    def test_token_is_cached_on_login_and_forgotten_on_logout(self):
+        Token.objects.create(user=self.user) # login of a user who already has a token
+        self.client.get(f'/api/buses/{self.bus.id}/availability/') # cache the seat bitmap
+
+        token = self.client.post('/api/login/', {'username': 'alice', 'password': 'secret'}).data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+        with self.assertNumQueries(0):
+            self.client.get(f'/api/buses/{self.bus.id}/availability/')
+
+        self.assertEqual(self.client.post('/api/logout/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/buses/{self.bus.id}/availability/').status_code, 401)
+
+    @skipUnless(settings.CACHES['default']['BACKEND'] in authentication.PROCESS_CACHES, 'the cache is shared between processes')
+    def test_tokens_are_not_kept_longer_by_a_per_process_cache(self):
+        self.assertEqual(authentication.SHARED_TIMEOUT, authentication.LOCAL_TIMEOUT) # a logout in another process is seen within the lifetime of a local entry
+
+    def test_deactivated_user_is_not_served_from_cache(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get(f'/api/buses/{self.bus.id}/availability/')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(f'/api/buses/{self.bus.id}/availability/').status_code, 401)
+
+# consumer used by 'BookingEventTests', it fails while 'failures' is positive
+delivered = []
+failures = [0]
+def record_delivery(events):
+    if failures[0]:
+        failures[0] -= 1
+        raise RuntimeError('consumer is down')
+    delivered.extend((event.kind, event.payload['seat']) for event in events)
+
+# tests of the booking event outbox
+@override_settings(BOOKING_EVENT_CONSUMERS=['bookings.tests.record_delivery'])
+class BookingEventTests(TestCase):
+    def setUp(self):
+        get_consumers.cache_clear()
+        self.addCleanup(get_consumers.cache_clear)
+        delivered.clear()
+        self.seats = list(create_bus().seats.all())
+        self.user = User.objects.create(username='alice')
+
+    def test_events_are_recorded_with_bookings_and_delivered_by_workers(self):
+        book_seats(self.user, self.seats[0].bus_id, [self.seats[0].id, self.seats[1].id])
+        cancel_booking(self.user, self.seats[0].id)
+        with self.assertRaises(SeatAlreadyBooked):
+            book_seat(self.user, self.seats[1].id)
+
+        self.assertEqual(delivered, [])
+        self.assertEqual(drain(batch_size=2), 3)
+        self.assertEqual(delivered, [('booking.created', self.seats[0].id), ('booking.created', self.seats[1].id), ('booking.cancelled', self.seats[0].id)])
+        self.assertFalse(BookingEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_failed_batches_are_retried_later(self):
+        failures[0] = 1
+        book_seat(self.user, self.seats[0].id)
+
+        with self.assertLogs('bookings.events', 'ERROR'):
+            self.assertEqual(drain(), 1)
+        event = BookingEvent.objects.get()
+        self.assertEqual((event.attempts, event.processed_at, delivered), (1, None, []))
+
+        BookingEvent.objects.update(available_at=timezone.now())
+        drain()
+        self.assertEqual(delivered, [('booking.created', self.seats[0].id)])
+
+# tests of the waitlist
+class WaitlistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bus = create_bus(no_of_seats=1)
+        self.seat = self.bus.seats.get()
+        self.users = [User.objects.create(username=f'user{i}') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[1])
+
+    def test_waitlist_is_joined_only_when_sold_out(self):
+        self.assertEqual(self.client.post('/api/waitlist/', {'bus': self.bus.id}).status_code, 409)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(self.users[0], self.seat.id)
+        self.assertEqual(self.client.post('/api/waitlist/', {'bus': self.bus.id}).status_code, 201)
+        self.assertEqual(self.client.post('/api/waitlist/', {'bus': self.bus.id}).status_code, 409)
+
+    def test_cancelled_seat_goes_to_the_head_of_the_waitlist(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(self.users[0], self.seat.id)
+        late = join_waitlist(self.users[1], self.bus.id)
+        first = join_waitlist(self.users[2], self.bus.id)
+        WaitlistEntry.objects.filter(id=first.id).update(priority=1)
+
+        cancel_booking(self.users[0], self.seat.id)
+
+        self.assertEqual(Booking.objects.get(seat=self.seat).user, self.users[2])
+        self.assertIsNotNone(WaitlistEntry.objects.get(id=first.id).booking)
+        self.assertIsNone(WaitlistEntry.objects.get(id=late.id).booking)
+        self.seat.refresh_from_db()
+        self.assertTrue(self.seat.is_booked)
+
+    def test_cancel_racing_another_cancel_changes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(self.users[0], self.seat.id)
+        join_waitlist(self.users[1], self.bus.id)
+        stale = Booking.objects.get(seat=self.seat) # read by a concurrent cancel before this one committed
+
+        cancel_booking(self.users[0], self.seat.id)
+        with mock.patch.object(QuerySet, 'first', return_value=stale):
+            self.assertRaises(BookingNotFound, cancel_booking, self.users[0], self.seat.id)
+
+        self.assertEqual(Booking.objects.get(seat=self.seat).user, self.users[1])
+        self.assertEqual(BookingEvent.objects.filter(kind=BookingEvent.CANCELLED).count(), 1)
+        self.seat.refresh_from_db()
+        self.assertTrue(self.seat.is_booked)
+
+    def test_bookings_of_departed_trips_are_not_cancelled(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(self.users[0], self.seat.id, tomorrow)
+        join_waitlist(self.users[1], self.bus.id, tomorrow)
+        departed = timezone.localdate() - timedelta(days=3)
+        Trip.objects.update(departure_date=departed)
+
+        self.assertRaises(TripDeparted, cancel_booking, self.users[0], self.seat.id, departed)
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.delete(f'/api/booking/{self.seat.id}/?date={departed}').status_code, 400)
+
+        self.assertEqual(list(Booking.objects.values_list('user', flat=True)), [self.users[0].id])
+        self.assertFalse(BookingEvent.objects.filter(kind=BookingEvent.CANCELLED).exists())
+        self.assertIsNone(WaitlistEntry.objects.get().booking)
+
+# tests of the cached bus details
+class BusDetailViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bus = create_bus()
+        self.seat = self.bus.seats.get(position=0)
+        self.user = User.objects.create(username='rider')
+
+    def test_unchanged_bus_is_not_modified(self):
+        response = self.client.get(f'/api/buses/{self.bus.id}/')
+        self.assertEqual(len(response.json()['seats']), 4)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(f'/api/buses/{self.bus.id}/')
+            not_modified = self.client.get(f'/api/buses/{self.bus.id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.json(), response.json())
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_booking_and_bus_updates_change_the_version(self):
+        etag = self.client.get(f'/api/buses/{self.bus.id}/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(self.user, self.seat.id)
+        response = self.client.get(f'/api/buses/{self.bus.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['seats'][0]['is_booked'])
+
+        self.bus.bus_name = 'Night Express'
+        self.bus.save()
+        response = self.client.get(f'/api/buses/{self.bus.id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.json()['bus_name'], 'Night Express')
+
+    def test_versions_of_unknown_buses_expire(self):
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            self.assertEqual(self.client.get('/api/buses/12345/').status_code, 404)
+
+        key, version, timeout = add.call_args.args
+        self.assertEqual(key, 'bookings:version:12345')
+        self.assertIsNotNone(timeout) # random ids requested by anyone do not pile up in the cache forever
+
+    def test_any_version_matches_existing_buses_only(self):
+        self.assertEqual(self.client.get(f'/api/buses/{self.bus.id}/', HTTP_IF_NONE_MATCH='*').status_code, 304)
+        self.assertEqual(self.client.get('/api/buses/0/', HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+# tests of the seat map stream
+class BusSeatStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bus = create_bus()
+        self.seat = self.bus.seats.get(position=2)
+        self.user = User.objects.create(username='rider')
+
+    def book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seat(self.user, self.seat.id)
+
+    async def test_stream_sends_snapshot_then_booked_seats(self):
+        response = await self.async_client.get(f'/api/buses/{self.bus.id}/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        snapshot = (await anext(stream)).decode()
+        self.assertTrue(snapshot.startswith('retry: 1000\nevent: snapshot\n')) # clients reconnect a second after the stream closes
+
+        await sync_to_async(self.book)()
+        event, data = (await anext(stream)).decode().split('\n')[:2]
+        self.assertEqual(event, 'event: seats')
+        self.assertEqual(json.loads(data[len('data: '):])['seats'], [{'id': self.seat.id, 'position': 2}])
+        await stream.aclose()
+
+    async def test_stream_of_a_date_sees_the_booking_that_creates_its_trip(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        response = await self.async_client.get(f'/api/buses/{self.bus.id}/events/?date={tomorrow}')
+        stream = aiter(response.streaming_content)
+        await anext(stream) # snapshot
+        self.assertFalse(await Trip.objects.aexists())
+
+        def book():
+            with self.captureOnCommitCallbacks(execute=True):
+                book_seat(self.user, self.seat.id, tomorrow)
+        await sync_to_async(book)()
+
+        event, data = (await anext(stream)).decode().split('\n')[:2]
+        self.assertEqual((event, json.loads(data[len('data: '):])['date']), ('event: seats', tomorrow.isoformat()))
+        await stream.aclose()
+
+    async def test_unknown_bus_is_not_found(self):
+        response = await self.async_client.get('/api/buses/0/events/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_stream_tells_the_client_to_reconnect_after_its_lifetime(self):
+        with mock.patch('bookings.views.STREAM_SECONDS', 0.05):
+            response = await self.async_client.get(f'/api/buses/{self.bus.id}/events/')
+            events = [chunk.decode() async for chunk in response.streaming_content]
+
+        self.assertTrue(events[0].startswith('retry: 1000\nevent: snapshot\n'))
+        self.assertTrue(events[-1].startswith('event: reconnect\n')) # and the stream ends
+
+    def test_stream_is_not_served_by_the_wsgi_application(self):
+        self.assertEqual(self.client.get(f'/api/buses/{self.bus.id}/events/').status_code, 501)
+
+# tests of the bus import
+class BusImportTests(TestCase):
+    HEADER = 'bus_name,number,origin,destination,features,start_time,reach_time,no_of_seats,price,layout\n'
+
+    def setUp(self):
+        cache.clear()
+        create_bus(number='B1')
+
+    def test_command_upserts_buses_by_number(self):
+        path = self.enterContext(tempfile.TemporaryDirectory()) + '/fleet.csv'
+        with open(path, 'w') as file:
+            file.write(self.HEADER)
+            file.write('Express,B1,Pune,Goa,AC Sleeper,10:00,18:00,4,650.00,\n') # updates the existing bus
+            file.write('Express,B2,Pune,Goa,AC,10:00,18:00,6,500.00,2x2_seater\n')
+            file.write('Express,B3,Pune,Goa,AC,10:00,18:00,not a number,500.00,\n')
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_buses', path, '--chunk-size', '2', stdout=out, stderr=err)
+
+        self.assertIn('Imported 2 of 3 rows (1 created, 1 updated, 0 unchanged)', out.getvalue())
+        self.assertIn('line 4', err.getvalue())
+        self.assertEqual(Bus.objects.get(number='B1').features, 'AC Sleeper')
+        self.assertEqual(list(Seat.objects.filter(bus__number='B2').order_by('position').values_list('seat_number', flat=True)), ['1A', '1B', '1C', '1D', '2A', '2B'])
+
+    def test_api_imports_json_lines(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        rows = [{'bus_name': 'Express', 'number': f'J{i}', 'origin': 'Pune', 'destination': 'Goa', 'features': 'AC',
+                 'start_time': '10:00', 'reach_time': '18:00', 'no_of_seats': 3, 'price': '500.00'} for i in range(3)]
+        upload = SimpleUploadedFile('fleet.jsonl', '\n'.join(json.dumps(row) for row in rows).encode())
+
+        response = client.post('/api/buses/import/', {'file': upload})
+
+        self.assertEqual((response.status_code, response.json()['created']), (200, 3))
+        self.assertEqual(Seat.objects.filter(bus__number__startswith='J').count(), 9)
+
+    def test_import_of_a_new_price_drops_cached_fares(self):
+        self.assertEqual(str(pricing.quote(Bus.objects.get(number='B1').id)), '500.00') # caches fare tiers of the bus
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_buses(io.StringIO(self.HEADER + 'Express,B1,Pune,Goa,AC,10:00,18:00,4,700.00,\n'), 'csv')
+
+        self.assertEqual(str(pricing.quote(Bus.objects.get(number='B1').id)), '700.00')
+
+# tests of dynamic fares
+class PricingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.bus = create_bus()
+        self.seat_ids = list(self.bus.seats.order_by('position').values_list('id', flat=True))
+        self.user = User.objects.create(username='rider')
+
+    def test_fare_rises_with_load_and_is_recorded_on_the_booking(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = book_seats(self.user, self.bus.id, self.seat_ids[:2])
+        with self.captureOnCommitCallbacks(execute=True):
+            third = book_seat(self.user, self.seat_ids[2])
+
+        self.assertEqual([str(booking.price_paid) for booking in first + [third]], ['500.00', '500.00', '550.00'])
+        self.assertEqual(str(pricing.quote(self.bus.id)), '625.00') # 3 of 4 seats booked
+
+        Bus.objects.filter(id=self.bus.id).update(price='900.00')
+        self.assertEqual(str(Booking.objects.get(id=third.id).price), '550.00') # history shows the fare charged, not the current one
+
+    def test_fare_follows_bus_price_and_departure_date(self):
+        self.bus.price = '400.00'
+        self.bus.save()
+        self.assertEqual(str(pricing.quote(self.bus.id)), '400.00')
+
+        tomorrow = get_trip(self.bus.id, timezone.localdate() + timedelta(days=1))
+        later = get_trip(self.bus.id, timezone.localdate() + timedelta(days=30))
+        self.assertEqual((str(pricing.quote(self.bus.id, tomorrow)), str(pricing.quote(self.bus.id, later))), ('480.00', '400.00'))
+
+# tests of rate limiting and admission control
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        throttling.store.clear()
+        self.user = User.objects.create(username='alice')
+        self.bus = create_bus()
+        self.client = APIClient()
+
+    @override_settings(RATE_LIMITS={'login_username': (2, 1)})
+    def test_login_attempts_are_limited_per_username(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/login/', {'username': 'alice', 'password': 'guess'}).status_code, 401)
+
+        response = self.client.post('/api/login/', {'username': 'alice', 'password': 'guess'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 50) # a token comes back every minute
+        self.assertEqual(self.client.post('/api/login/', {'username': 'bob', 'password': 'guess'}).status_code, 401)
+        self.assertEqual(self.client.post('/api/login/', {'username': 'alice', 'password': 'guess'}, REMOTE_ADDR='10.0.0.2').status_code, 401) # the owner of the account is not locked out
+
+    @override_settings(RATE_LIMITS={'login_account': (3, 1)})
+    def test_login_attempts_of_one_username_are_limited_across_addresses(self):
+        for i in range(3):
+            self.assertEqual(self.client.post('/api/login/', {'username': 'alice', 'password': 'guess'}, REMOTE_ADDR=f'10.0.2.{i}').status_code, 401)
+
+        self.assertEqual(self.client.post('/api/login/', {'username': 'alice', 'password': 'guess'}, REMOTE_ADDR='10.0.2.3').status_code, 429)
+        self.assertEqual(self.client.post('/api/login/', {'username': 'bob', 'password': 'guess'}, REMOTE_ADDR='10.0.2.3').status_code, 401)
+
+    @override_settings(RATE_LIMITS={'login_ip': (2, 1)})
+    def test_forwarded_addresses_sent_by_clients_are_not_trusted(self):
+        for i in range(2):
+            self.assertEqual(self.client.post('/api/login/', {'username': f'user{i}', 'password': 'guess'}, HTTP_X_FORWARDED_FOR=f'10.0.1.{i}').status_code, 401)
+
+        self.assertEqual(self.client.post('/api/login/', {'username': 'user2', 'password': 'guess'}, HTTP_X_FORWARDED_FOR='10.0.1.2').status_code, 429)
+
+    def test_bookings_beyond_the_concurrency_limit_are_rejected(self):
+        self.client.force_authenticate(self.user)
+        limiter = throttling.ConcurrencyLimiter(1, 0)
+        limiter.acquire() # a booking in progress holds the only slot
+
+        with mock.patch.object(BookingView, 'admission', limiter):
+            self.assertEqual(self.client.post('/api/booking/', {'seat': self.bus.seats.first().id}).status_code, 429)
+            limiter.release()
+            self.assertEqual(self.client.post('/api/booking/', {'seat': self.bus.seats.first().id}).status_code, 201)
+
+        self.assertTrue(limiter.acquire()) # the slot was released after the booking
+
+# tests of the benchmark harness
+class BenchmarkTests(TestCase):
+    def test_regressions_are_reported_against_the_baseline(self):
+        result = summarize([0.01] * 95 + [0.1] * 5, [3] * 100, [], duration=2)
+        self.assertEqual((result['p50_ms'], result['p99_ms'], result['throughput'], result['queries_per_request']), (10.0, 100.0, 50.0, 3))
+
+        baseline = {'bus_detail': {**result, 'p95_ms': result['p95_ms'] / 2, 'queries_per_request': 2}, 'book_seat': result}
+        self.assertEqual(compare({'bus_detail': result, 'book_seat': result}, baseline, tolerance=0.2), [
+            f"bus_detail p95_ms: {result['p95_ms']} (baseline {result['p95_ms'] / 2})",
+            'bus_detail queries_per_request: 3.0 (baseline 2)',
+        ])
+        self.assertEqual(compare({'bus_detail': {**result, 'queries_per_request': 0.4}}, {'bus_detail': {**result, 'queries_per_request': 0.35}}, tolerance=0.2), []) # a few cache misses more
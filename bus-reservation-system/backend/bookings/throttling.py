@@ -0,0 +1,158 @@
+import math # import math to round waiting time up to whole seconds
+import threading # import threading to guard buckets and admission slots shared by request threads
+import time # import time to refill buckets as time passes
+
+from django.conf import settings # import settings to read rates, the bucket store and admission limits
+from django.core.cache import cache # import cache to share buckets between processes
+from django.utils.module_loading import import_string # import import_string to load the bucket store from its dotted path
+from rest_framework.exceptions import Throttled # import Throttled to reject requests with '429 Too Many Requests'
+from rest_framework.throttling import BaseThrottle # import BaseThrottle to plug token buckets into DRF views
+from .authentication import LRUCache # import LRUCache to keep a bounded number of buckets in memory
+
+# (burst, requests per minute) of every throttle scope, overridden by 'RATE_LIMITS' setting
+DEFAULT_RATES = {
+    'login_ip': (20, 10),
+    'login_username': (5, 5),
+    'login_account': (30, 10),
+    'booking_ip': (60, 120),
+    'booking_user': (10, 30),
+}
+
+# create a class that keeps token buckets in the memory of this process, every process limits the requests it serves on its own
+# a bucket left alone for an hour is dropped, by then it is full again with any of the rates above and a missing bucket counts as full
+class LocalBucketStore:
+    def __init__(self, maxsize=getattr(settings, 'RATE_LIMIT_CACHE_SIZE', 100000)):
+        self._buckets = LRUCache(maxsize, timeout=3600)
+        self._lock = threading.Lock()
+
+    # take a token from the bucket of 'key' and return 0, or return the seconds until a token is available when the bucket is empty
+    # a bucket holds up to 'capacity' tokens and gets 'rate' tokens back every second
+    def consume(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+
+            if tokens < 1:
+                self._buckets.set(key, (tokens, now))
+                return (1 - tokens) / rate
+
+            self._buckets.set(key, (tokens - 1, now))
+            return 0
+
+    def clear(self):
+        self._buckets.clear()
+
+# create a class that keeps token buckets in the shared cache, so that all processes limit requests together
+# reading and writing a bucket are two cache operations, so concurrent requests can occasionally take the same token, which is fine for rate limiting
+class CacheBucketStore:
+    def consume(self, key, capacity, rate):
+        key = f'bookings:bucket:{key}'
+        now = time.time()
+        tokens, stamp = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - stamp) * rate)
+        timeout = int(capacity / rate) + 1 # a bucket left alone that long is full again, which is the same as a missing bucket
+
+        if tokens < 1:
+            cache.set(key, (tokens, now), timeout)
+            return (1 - tokens) / rate
+
+        cache.set(key, (tokens - 1, now), timeout)
+        return 0
+
+    def clear(self):
+        pass
+
+store = import_string(getattr(settings, 'RATE_LIMIT_STORE', 'bookings.throttling.LocalBucketStore'))() # store of the buckets of every throttle
+
+# create a throttle class that limits requests with a token bucket per client, subclasses set 'scope' and may tell how clients are identified
+# rates are read from 'RATE_LIMITS' setting as (burst, requests per minute) on every request, so they can be changed by tests
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    # return the key of the bucket of a request, or None to let the request through, clients are identified by their IP address unless a subclass says otherwise
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+
+        capacity, per_minute = {**DEFAULT_RATES, **getattr(settings, 'RATE_LIMITS', {})}[self.scope]
+        self.wait_seconds = store.consume(f'{self.scope}:{ident}', capacity, per_minute / 60)
+        return not self.wait_seconds
+
+    # return whole seconds the client has to wait, sent as 'Retry-After' header
+    def wait(self):
+        return math.ceil(self.wait_seconds)
+
+# create a throttle class that gives every client IP address its own bucket
+class IPThrottle(TokenBucketThrottle):
+    pass
+
+# create a throttle class that gives every authenticated user their own bucket
+class UserThrottle(TokenBucketThrottle):
+    def get_ident_key(self, request):
+        return request.user.pk if request.user and request.user.is_authenticated else None
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+# create a throttle class that gives every username tried on login from an IP address its own bucket, which slows down guessing the password of one account
+# the bucket is not shared by all addresses, so failed attempts by someone else can not lock the owner of the account out, 'LoginIPThrottle' limits every address on top
+class LoginUsernameThrottle(TokenBucketThrottle):
+    scope = 'login_username'
+
+    def get_ident_key(self, request):
+        username = request.data.get('username')
+        return f'{str(username).lower()}:{self.get_ident(request)}' if username else None
+
+# create a throttle class that gives every username tried on login one bucket shared by all addresses, which limits guessing the password of one account from many addresses
+# its burst is larger than the one of 'LoginUsernameThrottle', so an attacker has to spend many failed attempts before the owner of the account is slowed down as well
+class LoginAccountThrottle(TokenBucketThrottle):
+    scope = 'login_account'
+
+    def get_ident_key(self, request):
+        username = request.data.get('username')
+        return str(username).lower() if username else None
+
+class BookingIPThrottle(IPThrottle):
+    scope = 'booking_ip'
+
+class BookingUserThrottle(UserThrottle):
+    scope = 'booking_user'
+
+# create a class that admits at most 'limit' requests at once and lets further requests wait up to 'timeout' seconds for a free slot
+# requests that get no slot are rejected right away instead of piling up on the database, the limit applies to every process on its own
+class ConcurrencyLimiter:
+    def __init__(self, limit, timeout):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self):
+        return self._slots.acquire(timeout=self.timeout)
+
+    def release(self):
+        self._slots.release()
+
+booking_admission = ConcurrencyLimiter(getattr(settings, 'BOOKING_CONCURRENCY_LIMIT', 32), getattr(settings, 'BOOKING_QUEUE_SECONDS', 0.05)) # admission of requests that book seats
+
+# create a mixin for 'APIView' that admits requests through the limiter in 'admission' after they were authenticated and throttled
+class AdmissionControlMixin:
+    admission = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.admission is not None:
+            if not self.admission.acquire():
+                raise Throttled(wait=1, detail='Too many bookings are in progress, try again shortly.')
+            self.admitted = True
+
+    def dispatch(self, request, *args, **kwargs):
+        self.admitted = False
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.admitted:
+                self.admission.release()
@@ -1,12 +1,23 @@
 from django.urls import path # import path to define url patterns for the views
-from .views import RegisterView, LoginView, BusListCreateView, UserBookingView, BookingView, BusDetailView, DeleteBookingView
+from .views import RegisterView, LoginView, LogoutView, BusListCreateView, BusSearchView, BusImportView, UserBookingView, BookingView, BatchBookingView, BusDetailView, BusAvailabilityView, DeleteBookingView, HoldView, DeleteHoldView, WaitlistView, DeleteWaitlistView, AnalyticsView, bus_seat_stream
 
 urlpatterns = [
     path('buses/', BusListCreateView.as_view(), name='buslist'), # maps '/buses/' to BusListCreateView
+    path('buses/search/', BusSearchView.as_view(), name='bus-search'), # maps '/buses/search/' to BusSearchView
+    path('buses/import/', BusImportView.as_view(), name='bus-import'), # maps '/buses/import/' to BusImportView
     path('buses/<int:pk>/', BusDetailView.as_view(), name='bus-detail'), # maps '/buses/<int:pk>/' to BusDetailView
+    path('buses/<int:pk>/availability/', BusAvailabilityView.as_view(), name='bus-availability'), # maps '/buses/<int:pk>/availability/' to BusAvailabilityView
+    path('buses/<int:pk>/events/', bus_seat_stream, name='bus-seat-stream'), # maps '/buses/<int:pk>/events/' to bus_seat_stream
     path('register/', RegisterView.as_view(), name = 'register'), # maps '/register/' to RegisterView
     path('login/', LoginView.as_view(), name = 'login'), # maps '/login/' to LoginView
+    path('logout/', LogoutView.as_view(), name = 'logout'), # maps '/logout/' to LogoutView
     path('user/<int:user_id>/bookings/', UserBookingView.as_view(), name="user-bookings"), # maps '/user/<int:user_id>/bookings/' to UserBookingView
     path('booking/', BookingView.as_view(), name="booking"), # maps '/booking/' to BookingView
-    path('booking/<int:seat_id>/', DeleteBookingView.as_view(), name='delete-booking') # maps /booking/<int:seat_id>/ to DeleteBookingView
+    path('booking/batch/', BatchBookingView.as_view(), name="batch-booking"), # maps '/booking/batch/' to BatchBookingView
+    path('booking/<int:seat_id>/', DeleteBookingView.as_view(), name='delete-booking'), # maps /booking/<int:seat_id>/ to DeleteBookingView
+    path('hold/', HoldView.as_view(), name='hold'), # maps '/hold/' to HoldView
+    path('hold/<int:seat_id>/', DeleteHoldView.as_view(), name='delete-hold'), # maps '/hold/<int:seat_id>/' to DeleteHoldView
+    path('waitlist/', WaitlistView.as_view(), name='waitlist'), # maps '/waitlist/' to WaitlistView
+    path('waitlist/<int:entry_id>/', DeleteWaitlistView.as_view(), name='delete-waitlist'), # maps '/waitlist/<int:entry_id>/' to DeleteWaitlistView
+    path('analytics/', AnalyticsView.as_view(), name='analytics'), # maps '/analytics/' to AnalyticsView
 ]
\ No newline at end of file
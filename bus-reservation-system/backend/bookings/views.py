@@ -1,11 +1,32 @@
+import asyncio # import asyncio to close seat map streams after their lifetime
+import base64 # import base64 to send the seat availability bitmap as text
+import json # import json to encode messages of seat map streams
+from asgiref.sync import sync_to_async # import sync_to_async to read the database from the async seat map stream
+from django.conf import settings # import settings to read how long seat map streams stay open
+from django.core.handlers.asgi import ASGIRequest # import ASGIRequest to tell requests served by the ASGI application apart
+from django.http import JsonResponse, StreamingHttpResponse # import StreamingHttpResponse to keep a seat map stream open and JsonResponse to report errors of the stream
 from django.contrib.auth import authenticate # import authenticate function to check user credentials
-from rest_framework.permissions import IsAuthenticated # import IsAuthenticated class to check if user is authenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser # import IsAuthenticated and IsAdminUser classes to check if user is authenticated or is staff
 from rest_framework.authtoken.models import Token # import Token class to generate authentication token for user
 from rest_framework import status, generics # import status to get HTTP status codes like 404, generics to get in-built views to create, update, delete and list elements
 from rest_framework.views import APIView # import APIView to create class based views
-from .serializers import UserRegisterSerializer, BusSerializer, BookingSerializer # import all the serializers
+from rest_framework.parsers import MultiPartParser # import MultiPartParser to receive uploaded import files
+from django.db.models import Count, Q # import Count and Q to count seats of buses in the database
+from django.core.cache import cache # import cache to serve serialized bus details without reading seats again
+from django.utils.http import parse_etags # import parse_etags to read 'If-None-Match' header of conditional requests
+from .serializers import UserRegisterSerializer, BusSerializer, BusListSummarySerializer, BusSearchSerializer, BookingFilterSerializer, AnalyticsFilterSerializer, BookingSerializer, WaitlistEntrySerializer # import all the serializers
+from .pagination import OptionalPageNumberPagination, BusSearchPagination # import pagination classes to split long lists into pages
 from rest_framework.response import Response # import Response class to send HTTP responses with custom data
-from .models import Bus, Seat, Booking # import all the models
+from .models import Bus, Booking, BookingArchive # import the models
+from .archive import BookingHistory # import BookingHistory to list current and archived bookings together
+from . import availability # import availability to serve the cached seat bitmap of a bus
+from . import pricing # import pricing to quote the current fare of a bus
+from .broadcast import broker # import broker to receive booked and freed seats of a bus
+from .authentication import remember_token # import remember_token to cache the token of a user who logs in
+from .importer import import_buses, guess_format, text_stream # import import_buses to upsert buses from uploaded files
+from .throttling import LoginIPThrottle, LoginUsernameThrottle, LoginAccountThrottle, BookingIPThrottle, BookingUserThrottle, AdmissionControlMixin, booking_admission # import throttles and admission control to protect login and booking
+from .analytics import get_analytics # import get_analytics to serve cached fare and inventory analytics
+from .engine import book_seat, book_seats, cancel_booking, hold_seat, release_hold, join_waitlist, leave_waitlist, find_trip, BookingError, SeatAlreadyBooked, BookingNotFound, HoldNotFound, SeatsAvailable, AlreadyWaitlisted, WaitlistEntryNotFound # import booking engine to book and cancel seats atomically
 
 # create a class based view called 'RegisterView' to register a new user that extends/inherits 'APIView'
 class RegisterView(APIView):
@@ -17,11 +38,15 @@ class RegisterView(APIView):
         if serializer.is_valid():
             user = serializer.save() # save the user data to the serializer
             token, created = Token.objects.get_or_create(user=user) # generate a token for the user if it doesn't exist already or get it's token if it already exists
+            remember_token(token, user) # cache the token so that following requests of the user are authenticated without a query
             return Response({'token':token.key}, status= status.HTTP_201_CREATED) # return response of user registeration being successful with the token generated
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST) # otherwise return response of user registeration being unsuccessful with the errors encountered
 
 # create a class based view called 'LoginView' to login a user that extends/inherits 'APIView'
+# requests are throttled per client IP address and per username before the password is hashed, so credential stuffing is rejected cheaply
 class LoginView(APIView):
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle, LoginAccountThrottle] # limit login attempts with a token bucket per IP address, per username tried from an IP address and per username
+
     # create a function called 'post' that takes HTTP request as a parameter
     def post(self, request):
         username = request.data.get('username') # get the username from the HTTP request
@@ -30,6 +55,7 @@ class LoginView(APIView):
 
         if user: # if user is authenticated
             token, created = Token.objects.get_or_create(user=user) # generate a token for the user if it doesn't exist already or get it's token if it already exists
+            remember_token(token, user) # cache the token so that following requests of the user are authenticated without a query
             # return response of user login being successful with the token generated and user id as well
             return Response({
                 'token':token.key,
@@ -39,46 +65,372 @@ class LoginView(APIView):
         else:
             return Response({'error':'Invalid Credentials'}, status=status.HTTP_401_UNAUTHORIZED) # otherwise return response of user login being unsuccessful with the error encountered
 
+# create a class based view called 'LogoutView' to logout a user that extends/inherits 'APIView'
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated] # only authenticated users can access this view
+
+    # create a function called 'post' that takes HTTP request as a parameter
+    def post(self, request):
+        request.auth.delete() # delete the token of the user, which also drops it from the token caches, a new token is generated on next login
+        return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
+
 # create a class based view called 'BusListCreateView' to serialize data of 'Bus' to create and list buses that extends/inherits 'generics.ListCreateAPIView'
 class BusListCreateView(generics.ListCreateAPIView):
     queryset = Bus.objects.all() # get all the buses from the database
     serializer_class = BusSerializer # serialize the data received
+    pagination_class = OptionalPageNumberPagination # paginate buses when '?page=' or '?page_size=' is sent
+
+    # return True when the client asks for seat counts instead of every seat with '?summary=true'
+    def is_summary(self):
+        return self.request.query_params.get('summary', '').lower() in ('1', 'true', 'yes')
+
+    # list buses with seats of all of them loaded by a single query, or with seat counts computed by the database in summary mode
+    # either way a page of buses costs a constant number of queries no matter how many buses or seats there are
+    def get_queryset(self):
+        if self.request.method == 'GET' and self.is_summary():
+            return Bus.objects.annotate(
+                total_seats=Count('seats'),
+                available_seats=Count('seats', filter=Q(seats__is_booked=False)),
+            ).order_by('id')
+        return Bus.objects.prefetch_related('seats').order_by('id')
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and self.is_summary():
+            return BusListSummarySerializer
+        return BusSerializer
+
+    # accept a list of buses in a single request and create them together in bulk
+    def get_serializer(self, *args, **kwargs):
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+# create a class based view called 'BusSearchView' to search buses of a route on the server that extends/inherits 'generics.ListAPIView'
+# filters on origin, destination and departure time are served by the 'bus_route_departure_idx' index, so a search costs as much as the buses it returns
+class BusSearchView(generics.ListAPIView):
+    serializer_class = BusListSummarySerializer # serialize buses with seat counts instead of every seat
+    pagination_class = BusSearchPagination # page through results with a cursor ordered by departure time
+
+    def get_queryset(self):
+        # validate query parameters of the search, invalid values return error response
+        params = BusSearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        # map every query parameter to the lookup it filters on
+        lookups = {
+            'origin': 'origin',
+            'destination': 'destination',
+            'depart_after': 'start_time__gte',
+            'depart_before': 'start_time__lte',
+            'min_price': 'price__gte',
+            'max_price': 'price__lte',
+        }
+        buses = Bus.objects.filter(**{lookup: params[name] for name, lookup in lookups.items() if name in params})
+
+        buses = buses.annotate(
+            total_seats=Count('seats'),
+            available_seats=Count('seats', filter=Q(seats__is_booked=False)),
+        )
+
+        if 'min_seats' in params:
+            buses = buses.filter(available_seats__gte=params['min_seats'])
+
+        return buses
 
 # create a class based view called 'BusDetailView' to serialize data of 'Bus' to retrieve, update and delete bus details that extends/inherits 'generics.RetrieveUpdateDestroyAPIView'
+# details are cached per version of the bus, and the version is sent as 'ETag' so that clients polling the seat map get '304 Not Modified' while nothing changes
 class BusDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Bus.objects.all() # get all the buses from the database
+    queryset = Bus.objects.prefetch_related('seats') # get all the buses from the database along with their seats
     serializer_class = BusSerializer # serialize the data received
+    cache_timeout = 300 # seconds serialized details of a version stay cached, a new version is cached under a new key anyway
+
+    # create a function called 'retrieve' that returns details of a bus from cache, or nothing when the client already has the current version
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs['pk']
+        version = availability.get_version(pk) # read the version before the bus so that cached details are never older than their version
+        etag = f'"{pk}-{version}"'
+
+        # if the client already has the current version, return an empty response
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        key = f'bookings:bus:{pk}:{version}'
+        data = cache.get(key)
+
+        # '*' matches any current version, so it only applies to a bus that exists, cached details of the current version prove that without a query
+        if '*' in etags and (data is not None or Bus.objects.filter(pk=pk).exists()):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        if data is None:
+            data = self.get_serializer(self.get_object()).data
+            cache.set(key, data, self.cache_timeout)
+
+        # 'no-cache' makes clients and proxies revalidate every time, which is answered with '304' until the version changes
+        return Response(data, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+KEEPALIVE_SECONDS = 15 # seconds after which an idle seat map stream sends a comment so that proxies do not close it
+STREAM_SECONDS = getattr(settings, 'SEAT_STREAM_SECONDS', 300) # seconds a seat map stream stays open before the client is told to reconnect
+RETRY_MILLISECONDS = 1000 # milliseconds a client waits before it reconnects to a closed seat map stream
+
+# create a function that formats a Server-Sent Event
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+# create an async generator that sends the seat map of a bus or trip followed by the seats booked and freed afterwards
+# changes are matched by departure date rather than trip id, since the trip of a date nobody booked yet is only created by its first booking
+async def _seat_map_stream(subscription, trip, seats):
+    try:
+        no_of_seats, bitmap = seats
+        date = trip and trip.departure_date.isoformat()
+        yield f'retry: {RETRY_MILLISECONDS}\n' + _sse('snapshot', {'bus': subscription.bus_id, 'trip': trip and trip.pk, 'date': date, 'no_of_seats': no_of_seats, 'booked': base64.b64encode(bitmap).decode()})
+
+        loop = asyncio.get_running_loop()
+        closes_at = loop.time() + STREAM_SECONDS
+
+        while loop.time() < closes_at:
+            message = await subscription.get(min(KEEPALIVE_SECONDS, closes_at - loop.time()))
+
+            # the stream fell behind and missed messages, so ask the client to reconnect and start from a new snapshot
+            if subscription.overflowed:
+                yield _sse('resync', {'bus': subscription.bus_id})
+                return
+
+            if message is None:
+                yield ': keepalive\n\n'
+            elif message['date'] == date:
+                yield _sse('seats', message)
+
+        # the stream is open for 'STREAM_SECONDS' at most, so a stream never outlives a deploy and a reconnect loads a new snapshot
+        # that snapshot also picks up seats changed by other processes, whose messages the broker of this process never receives
+        yield _sse('reconnect', {'bus': subscription.bus_id})
+
+    finally: # the client disconnected or the stream ended
+        broker.unsubscribe(subscription)
+
+# create an async function based view that streams the seat map of a bus as Server-Sent Events, served by the ASGI application
+# one open connection per viewer replaces polling 'BusDetailView' or 'BusAvailabilityView', the first event is the bitmap of booked seats and every following event is a change to it
+# it is a plain Django view since DRF views are synchronous and can not hold a stream open on the event loop
+async def bus_seat_stream(request, pk):
+    trip = None
+
+    # a WSGI server reads the whole body of a streaming async response before it sends any of it, so streams are only served by the ASGI application (see 'ASGI_APPLICATION')
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Seat map streams are served by the ASGI application'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    # when '?date=' is sent, stream seats of the trip departing on that date instead of seats of the bus, looking at a date does not create its trip
+    if request.GET.get('date'):
+        try:
+            trip = await sync_to_async(find_trip)(pk, request.GET['date'])
+        except BookingError as error:
+            return JsonResponse({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    subscription = broker.subscribe(pk) # subscribe before reading the bitmap so that no change is missed between both
+    seats = await sync_to_async(availability.get_trip_availability)(pk, trip)
+
+    # if bus does not exist or has no seats, return error response
+    if seats is None:
+        broker.unsubscribe(subscription)
+        return JsonResponse({'error': 'Bus not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    response = StreamingHttpResponse(_seat_map_stream(subscription, trip, seats), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # stop nginx from buffering events
+    return response
+
+# create a class based view called 'BusImportView' to create and update buses from an uploaded CSV or JSON lines file that extends/inherits 'APIView'
+# the file is read in chunks while it is imported, so large files use as much memory as a single chunk
+class BusImportView(APIView):
+    permission_classes = [IsAdminUser] # only staff users can access this view
+    parser_classes = [MultiPartParser] # the file is sent as 'multipart/form-data'
+
+    # create a function called 'post' that takes HTTP request as a parameter
+    def post(self, request):
+        upload = request.FILES.get('file') # get the uploaded file from the HTTP request
+
+        # if no file was uploaded, return error response
+        if upload is None:
+            return Response({'error': 'Upload a CSV or JSON lines file as "file"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # read the format from the HTTP request or from the name of the file
+        format = request.data.get('format') or guess_format(upload.name)
+
+        try:
+            report = import_buses(text_stream(upload.file), format)
+        except ValueError as error: # unknown format
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(report, status=status.HTTP_200_OK)
+
+# create a class based view called 'BusAvailabilityView' to get which seats of a bus are booked without reading 'Seat' model on every request
+class BusAvailabilityView(APIView):
+    # create a function called 'get' that takes HTTP request and bus id as parameters
+    def get(self, request, pk):
+        trip = None
+
+        # when '?date=' is sent, serve seats of the trip departing on that date instead of seats of the bus, looking at a date does not create its trip
+        if request.query_params.get('date'):
+            try:
+                trip = find_trip(pk, request.query_params['date'])
+            except BookingError as error:
+                return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        trip_id = trip and trip.pk # None for the bus and for a trip nobody booked yet
+        seats = availability.get_trip_availability(pk, trip) # get the cached bitmap of booked seats of the bus or trip
+
+        # if bus does not exist or has no seats, return error response
+        if seats is None:
+            return Response({'error': 'Bus not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        no_of_seats, bitmap = seats
+
+        # return number of seats, number of free seats, the current fare and the bitmap where bit 'n' is set when the seat at position 'n' is booked
+        return Response({
+            'bus': pk,
+            'trip': trip_id,
+            'no_of_seats': no_of_seats,
+            'available': availability.count_available(no_of_seats, bitmap),
+            'booked': base64.b64encode(bitmap).decode(),
+            'fare': pricing.quote(pk, trip),
+        })
 
 # create a class based view called 'BusSeatView' to book seat that extends/inherits 'generics.APIView'
-class BookingView(APIView):
+# requests are throttled per user and per IP address, then admitted only while fewer than 'BOOKING_CONCURRENCY_LIMIT' bookings are in progress, otherwise '429' is returned right away
+class BookingView(AdmissionControlMixin, APIView):
     permission_classes = [IsAuthenticated] # only authenticated users can access this view
+    throttle_classes = [BookingUserThrottle, BookingIPThrottle] # limit booking requests with a token bucket per user and per IP address
+    admission = booking_admission # limit booking requests in progress at once
 
     def post(self, request): # create a function called 'post' that takes HTTP request as a parameter
         seat_id = request.data.get('seat') # get the seat id from the HTTP request
+        departure_date = request.data.get('date') # get the optional departure date of the trip from the HTTP request
         
+        # book the seat for the user and serialize data of the booking and return response of booking being successful
         try:
-            seat = Seat.objects.get(id = seat_id) # get record from 'Seat' model with the seat id received from the HTTP request
-            
-            # if seat is already booked, return error response
-            if seat.is_booked:
-                return Response({'error': 'Seat already booked'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # otherwise, book the seat by marking it's 'is_booked' property as True and save the booking
-            seat.is_booked = True
-            seat.save()
-
-            # create a new booking record for the user, bus and seat, serialize data of the booking and return response of booking being successful
-            bookings = Booking.objects.create(
-                user = request.user,
-                bus = seat.bus,
-                seat = seat
-            )
-            serializer = BookingSerializer(bookings)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            booking = book_seat(request.user, seat_id, departure_date)
+
+        # if seat is already booked (or another request booked it at the same time), return conflict response
+        except SeatAlreadyBooked as error:
+            return Response({'error': str(error)}, status=status.HTTP_409_CONFLICT)
         
-        # if seat to book does not exist, return error response
-        except Seat.DoesNotExist:
-            return Response({'error':'Invalid Seat ID'}, status=status.HTTP_400_BAD_REQUEST)
+        # if seat to book does not exist or the trip can not be booked, return error response
+        except BookingError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BookingSerializer(booking)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+# create a class based view called 'BatchBookingView' to book several seats of a bus at once that extends/inherits 'APIView'
+class BatchBookingView(AdmissionControlMixin, APIView):
+    permission_classes = [IsAuthenticated] # only authenticated users can access this view
+    throttle_classes = [BookingUserThrottle, BookingIPThrottle] # limit booking requests with a token bucket per user and per IP address
+    admission = booking_admission # limit booking requests in progress at once
+
+    def post(self, request): # create a function called 'post' that takes HTTP request as a parameter
+        bus_id = request.data.get('bus') # get the bus id from the HTTP request
+        seat_ids = request.data.get('seats') # get the list of seat ids from the HTTP request
+        departure_date = request.data.get('date') # get the optional departure date of the trip from the HTTP request
+
+        # if seats are not sent as a list, return error response
+        if not isinstance(seat_ids, list):
+            return Response({'error': 'Seats must be a list of seat ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # book all the seats in a single transaction, either all of them are booked or none of them
+        try:
+            bookings = book_seats(request.user, bus_id, seat_ids, departure_date)
+
+        # if any of the seats is already booked, return conflict response
+        except SeatAlreadyBooked as error:
+            return Response({'error': str(error)}, status=status.HTTP_409_CONFLICT)
+
+        # if any of the seats does not exist on the bus or too many seats were sent, return error response
+        except BookingError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BookingSerializer(bookings, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+# create a class based view called 'HoldView' to reserve a seat for a few minutes while the user pays that extends/inherits 'APIView'
+# booking the seat with 'BookingView' before the hold expires converts the hold into a booking
+class HoldView(APIView):
+    permission_classes = [IsAuthenticated] # only authenticated users can access this view
+
+    def post(self, request): # create a function called 'post' that takes HTTP request as a parameter
+        seat_id = request.data.get('seat') # get the seat id from the HTTP request
+        departure_date = request.data.get('date') # get the optional departure date of the trip from the HTTP request
+
+        # hold the seat for the user
+        try:
+            held_until = hold_seat(request.user, seat_id, departure_date)
+
+        # if seat is already booked or held by someone else, return conflict response
+        except SeatAlreadyBooked as error:
+            return Response({'error': str(error)}, status=status.HTTP_409_CONFLICT)
+
+        # if seat does not exist or the trip can not be booked, return error response
+        except BookingError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'seat': seat_id, 'held_until': held_until}, status=status.HTTP_201_CREATED) # return response with the time the hold expires at
+
+# create a class based view called 'DeleteHoldView' to release a held seat before its hold expires that extends/inherits 'APIView'
+class DeleteHoldView(APIView):
+    permission_classes = [IsAuthenticated] # only authenticated users can access this view
+
+    # create a function called 'delete' that takes HTTP request and seat id as parameters
+    def delete(self, request, seat_id):
+        # release the hold of the logged-in user on the given seat, on the trip departing on '?date=' if it is sent
+        try:
+            release_hold(request.user, seat_id, request.query_params.get('date'))
+
+        # if the user holds no such seat, return error response
+        except HoldNotFound as error:
+            return Response({'error': str(error)}, status=status.HTTP_404_NOT_FOUND)
+
+        # if the departure date is not valid, return error response
+        except BookingError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'message': 'Hold released successfully'}, status=status.HTTP_204_NO_CONTENT) # return response of hold being released successfully
+
+# create a class based view called 'WaitlistView' to wait for a seat of a sold out bus that extends/inherits 'APIView'
+# a seat freed by a cancellation is booked for the head of the waitlist right away, so waiting users do not have to poll for free seats
+class WaitlistView(APIView):
+    permission_classes = [IsAuthenticated] # only authenticated users can access this view
+
+    def post(self, request): # create a function called 'post' that takes HTTP request as a parameter
+        bus_id = request.data.get('bus') # get the bus id from the HTTP request
+        departure_date = request.data.get('date') # get the optional departure date of the trip from the HTTP request
+
+        # put the user on the waitlist of the bus or trip
+        try:
+            entry = join_waitlist(request.user, bus_id, departure_date)
+
+        # if the user is already waiting or seats are still available, return conflict response
+        except (AlreadyWaitlisted, SeatsAvailable) as error:
+            return Response({'error': str(error)}, status=status.HTTP_409_CONFLICT)
+
+        # if the bus does not exist or the trip can not be booked, return error response
+        except BookingError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+
+# create a class based view called 'DeleteWaitlistView' to leave a waitlist that extends/inherits 'APIView'
+class DeleteWaitlistView(APIView):
+    permission_classes = [IsAuthenticated] # only authenticated users can access this view
+
+    # create a function called 'delete' that takes HTTP request and waitlist entry id as parameters
+    def delete(self, request, entry_id):
+        try:
+            leave_waitlist(request.user, entry_id)
+
+        # if the entry does not exist, belongs to another user or was already promoted, return error response
+        except WaitlistEntryNotFound as error:
+            return Response({'error': str(error)}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({'message': 'Left the waitlist successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 # create a class based view called 'UserBookingView' to get bookings of a user that extends/inherits 'generics.APIView'
 class UserBookingView(APIView):
@@ -90,8 +442,32 @@ class UserBookingView(APIView):
         if request.user.id != user_id:
             return Response({'error':'Unauthorized'}, status=status.HTTP_401_UNAUTHORIZED)
         
-        # filter our records from 'Booking' model with the user id received from the HTTP request and serialize data of the bookings and return the serialized data
-        bookings = Booking.objects.filter(user_id = user_id)
+        # validate the optional date filters, invalid values return error response
+        filters = BookingFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        filters = filters.validated_data
+
+        # filter our records from 'Booking' and 'BookingArchive' models with the user id received from the HTTP request, both are served by an index on (user, booking time)
+        # bus, seat, trip and user of every booking are joined in the same query since the serializer reads all of them, so listing bookings costs a constant number of queries
+        querysets = []
+        for model in (Booking, BookingArchive):
+            bookings = model.objects.filter(user_id = user_id).select_related('bus', 'seat', 'trip', 'user').order_by('-booking_time', '-id')
+
+            if 'booked_after' in filters:
+                bookings = bookings.filter(booking_time__date__gte=filters['booked_after'])
+            if 'booked_before' in filters:
+                bookings = bookings.filter(booking_time__date__lte=filters['booked_before'])
+            querysets.append(bookings)
+
+        # current bookings are listed first and bookings of departed trips moved to the archive after them
+        bookings = BookingHistory(*querysets)
+
+        # paginate bookings when '?page=' or '?page_size=' is sent, serialize data of the bookings and return the serialized data
+        paginator = OptionalPageNumberPagination()
+        page = paginator.paginate_queryset(bookings, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(BookingSerializer(page, many=True).data)
+
         serializer = BookingSerializer(bookings, many=True)
         return Response(serializer.data)
 
@@ -101,19 +477,28 @@ class DeleteBookingView(APIView):
 
     # create a function called 'delete' that takes HTTP request and seat id as parameters
     def delete(self, request, seat_id):
+        # cancel the booking of the given seat made by the logged-in user, on the trip departing on '?date=' if it is sent, and free the seat again
         try:
-            # get booking detail for the given seat and the logged-in user
-            booking = Booking.objects.get(seat_id = seat_id, user = request.user)
+            cancel_booking(request.user, seat_id, request.query_params.get('date'))
+
+        # if seat to unbooked was not found or user was not authorized, return error response
+        except BookingNotFound as error:
+            return Response({'error': str(error)}, status=status.HTTP_404_NOT_FOUND)
 
-            # unbook the seat by marking it's 'is_booked' property as False and save the unbooking action
-            seat = booking.seat
-            seat.is_booked = False
-            seat.save()
+        # if the departure date is not valid, return error response
+        except BookingError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-            booking.delete() # delete the booked seat's records
+        return Response({'message': 'Booking cancelled successfully'}, status=status.HTTP_204_NO_CONTENT) # return response of booking being cancelled successfully
 
-            return Response({'message': 'Booking cancelled successfully'}, status=status.HTTP_204_NO_CONTENT) # return response of booking being cancelled successfully
 
-        # if seat to unbooked was not found or user was not authorized, return error response
-        except Booking.DoesNotExist:
-            return Response({'error': 'Booking not found or unauthorized'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+# create a class based view called 'AnalyticsView' to get load factor, revenue and bookings per hour of routes and buses that extends/inherits 'APIView'
+# figures are aggregated by the database and cached for 'ANALYTICS_CACHE_SECONDS', so dashboards can poll this view
+class AnalyticsView(APIView):
+    permission_classes = [IsAdminUser] # only staff users can access this view
+
+    # create a function called 'get' that takes HTTP request as a parameter
+    def get(self, request):
+        params = AnalyticsFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(get_analytics(params.validated_data['hours']))
\ No newline at end of file
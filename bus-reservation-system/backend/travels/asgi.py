@@ -3,6 +3,9 @@ ASGI config for travels project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Seat map streams are only served through it, run it with an ASGI server such as
+``uvicorn travels.asgi:application``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,10 +46,15 @@ REST_FRAMEWORK = {
        'rest_framework.permissions.AllowAny',
     ],
      'DEFAULT_AUTHENTICATION_CLASSES': [
-       'rest_framework.authentication.TokenAuthentication',
+       'bookings.authentication.CachedTokenAuthentication',
     ],
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)), # number of proxies in front of the server, throttles trust only that many addresses of 'X-Forwarded-For' so that clients can not pick their own address
 }
 
+AUTH_TOKEN_CACHE_SIZE = 10000 # maximum number of authentication tokens cached by every process
+AUTH_TOKEN_LOCAL_SECONDS = 30 # seconds a process keeps an authentication token, bounds how long a logged out token can be served by other processes
+AUTH_TOKEN_SHARED_SECONDS = 300 # seconds an authentication token is kept in the shared cache, cut to 'AUTH_TOKEN_LOCAL_SECONDS' when the cache is kept per process (see 'CACHES') since logouts are not seen by other processes then
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -60,6 +66,28 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+BOOKING_EVENT_CONSUMERS = [] # dotted paths of functions that receive batches of booking events from 'process_booking_events' workers, like sending confirmations or syncing the ledger
+
+ANALYTICS_CACHE_SECONDS = 60 # seconds fare and inventory analytics are cached before they are computed again
+
+SEAT_HOLD_MINUTES = 10 # minutes a seat stays reserved for a user during checkout before anyone else can book it
+BOOKING_HORIZON_DAYS = 180 # trips can be booked and looked up up to this many days ahead
+SEAT_STREAM_SECONDS = 300 # seconds a seat map stream stays open before the client is told to reconnect and load a new snapshot
+
+RATE_LIMITS = { # (burst, requests per minute) allowed by every throttle scope
+    'login_ip': (20, 10),
+    'login_username': (5, 5),
+    'login_account': (30, 10), # shared by all addresses trying one username, larger than 'login_username' so that others can not easily lock the owner out
+    'booking_ip': (60, 120),
+    'booking_user': (10, 30),
+}
+RATE_LIMIT_STORE = 'bookings.throttling.LocalBucketStore' # keeps buckets per process, 'bookings.throttling.CacheBucketStore' shares them through the cache
+BOOKING_CONCURRENCY_LIMIT = 32 # requests booking seats at once in every process, further requests wait for a slot
+BOOKING_QUEUE_SECONDS = 0.05 # seconds a booking request waits for a slot before it is rejected with 429
+
+FARE_LOAD_TIERS = [(0, '1.00'), (0.5, '1.10'), (0.75, '1.25'), (0.9, '1.50')] # (share of seats booked, fare multiplier), the last tier reached applies
+FARE_DEPARTURE_TIERS = [(1, '1.20'), (3, '1.10')] # (days to departure, fare multiplier), the first tier the trip departs within applies
+
 CORS_ALLOW_ALL_ORIGINS = True # allows all origins (domains) to make cross-origin requests to the server
 
 CORS_ALLOW_CREDENTIALS = True # allows cookies, authentication headers, or client-side certificates to be included in cross-origin requests
@@ -83,6 +111,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'travels.wsgi.application'
 
+# seat map streams ('/api/buses/<id>/events/') need the ASGI application, served for example by 'uvicorn travels.asgi:application', the WSGI application answers them with 501
+# seat changes reach streams through a broker kept in memory of every process (see 'bookings.broadcast'), so a stream only sees bookings made by its own process until it reconnects
+ASGI_APPLICATION = 'travels.asgi.application'
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -90,9 +122,41 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE', # take the write lock when a transaction begins so that concurrent bookings wait for each other instead of failing
+            'timeout': 20, # seconds a connection waits for the write lock
+        },
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3', # tests run against a file since concurrent connections to an in-memory database fail with 'table is locked'
+        },
     }
 }
 
+# use a local PostgreSQL server instead of SQLite when 'POSTGRES_DB' environment variable is set, for example to load test seat booking
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+    }
+
+# seat bitmaps, bus versions, fare tiers and authentication tokens are cached in memory of every process by default, which is only consistent with a single process
+# set 'REDIS_URL' environment variable, like 'redis://localhost:6379/0', to share them through Redis when the project runs in several processes
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
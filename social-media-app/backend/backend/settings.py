@@ -55,6 +55,11 @@ REST_FRAMEWORK = {
     )
 }
 
+# home timelines keep the ids of the latest posts of followed users, accounts with more followers than the fan-out limit are pulled when feeds are read
+TIMELINE_MAX_LENGTH = 800
+TIMELINE_FANOUT_LIMIT = 5000
+TIMELINE_TRIM_INTERVAL = 20 # posts whose id is a multiple of it trim the timelines they are pushed to, run 'trim_timelines' command periodically to bound every timeline
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -0,0 +1,57 @@
+from django.db import IntegrityError, transaction # import IntegrityError and transaction to insert rows guarded by unique constraints
+from django.db.models import Count, F, OuterRef, Q, Subquery # import query expressions to count follows and likes
+from django.db.models.functions import Coalesce # import Coalesce to count zero for users and posts without rows
+
+from .models import Follow, MyUser, Post # import models whose counters are reconciled
+
+BATCH_SIZE = 1000 # number of repaired rows written per query
+
+# create a function that deletes the row of 'through' table matching 'fields', or inserts it when there was none
+# it returns -1 when the row was deleted, 1 when it was inserted and 0 when a concurrent request inserted it first, which is the change to apply to counters
+# the unique constraint of the table decides between concurrent requests, so a row is never added twice and counters never move twice
+def toggle_row(through, **fields):
+    deleted, _ = through.objects.filter(**fields).delete()
+    if deleted:
+        return -1
+
+    try:
+        with transaction.atomic(): # use a savepoint so a conflicting insert does not break the caller's transaction
+            through.objects.create(**fields)
+    except IntegrityError:
+        return 0
+    return 1
+
+# create a function that returns a subquery counting rows of 'model' that match 'field' with the outer row, zero when there are none
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).values(field).annotate(count=Count('*')).values('count')
+    ), 0)
+
+# create a function that recounts follower, following and like counters from the follow and like tables and repairs those that drifted
+# counters drift when rows are removed without going through the views, like when users are deleted, so this runs as a periodic job
+# it returns the number of repaired users and posts
+def reconcile():
+    users = MyUser.objects.annotate(
+        actual_followers=count_of(Follow, 'from_myuser'),
+        actual_following=count_of(Follow, 'to_myuser')
+    ).filter(
+        ~Q(follower_count=F('actual_followers')) | ~Q(following_count=F('actual_following'))
+    ).only('pk')
+
+    repaired_users = []
+    for user in users.iterator():
+        user.follower_count, user.following_count = user.actual_followers, user.actual_following
+        repaired_users.append(user)
+    MyUser.objects.bulk_update(repaired_users, ['follower_count', 'following_count'], batch_size=BATCH_SIZE)
+
+    posts = Post.objects.annotate(
+        actual_likes=count_of(Post.likes.through, 'post')
+    ).exclude(like_count=F('actual_likes')).only('pk')
+
+    repaired_posts = []
+    for post in posts.iterator():
+        post.like_count = post.actual_likes
+        repaired_posts.append(post)
+    Post.objects.bulk_update(repaired_posts, ['like_count'], batch_size=BATCH_SIZE)
+
+    return len(repaired_users), len(repaired_posts)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand # import BaseCommand to create a management command
+from base.counters import reconcile # import reconcile to recount and repair counters
+
+# create a management command that repairs follower, following and like counters that drifted from the follow and like tables
+# profiles and feeds read these counters instead of counting rows, run it periodically with 'python manage.py reconcile_counters'
+class Command(BaseCommand):
+    help = 'Recount follower, following and like counters and repair those that drifted'
+
+    def handle(self, *args, **options):
+        users, posts = reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Repaired counters of {users} users and {posts} posts'))
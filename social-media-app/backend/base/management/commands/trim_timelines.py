@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand # import BaseCommand to create a management command
+from base.timeline import trim_all # import trim_all to trim timelines that grew too long
+
+# create a management command that trims home timelines holding more than 'TIMELINE_MAX_LENGTH' entries
+# posts only trim the timelines they are pushed to now and then, run it periodically with 'python manage.py trim_timelines' to bound every timeline
+class Command(BaseCommand):
+    help = 'Trim home timelines that hold more than TIMELINE_MAX_LENGTH entries'
+
+    def handle(self, *args, **options):
+        timelines = trim_all()
+        self.stdout.write(self.style.SUCCESS(f'Trimmed {timelines} timelines'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_follows(apps, schema_editor):
+    MyUser = apps.get_model('base', 'MyUser')
+    Follow = MyUser.followers.through
+
+    def count_of(field):
+        follows = Follow.objects.filter(**{field: OuterRef('pk')}).values(field).annotate(count=Count('*')).values('count')
+        return Coalesce(Subquery(follows), 0)
+
+    MyUser.objects.update(follower_count=count_of('from_myuser'), following_count=count_of('to_myuser'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0004_post_like_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='myuser',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='myuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_follows, migrations.RunPython.noop),
+    ]
@@ -25,14 +25,36 @@ class MyUser(AbstractUser): # define a class MyUser to create a custom user mode
         blank=True # allow field to be empty if user has no followers
     )
 
+    follower_count = models.PositiveIntegerField( # create a PositiveIntegerField to keep number of followers, so profiles do not count followers on every view
+        default=0 # new users have no followers
+    )
+
+    following_count = models.PositiveIntegerField( # create a PositiveIntegerField to keep number of users the user follows
+        default=0 # new users follow nobody
+    )
+
     def __str__(self): # define a method __str__ to return string representation of MyUser object
         return self.username # return username to represent user object as readable text
 
+Follow = MyUser.followers.through # through model of follows, 'from_myuser' is the followed user and 'to_myuser' the follower, unique on both
+
+class PostQuerySet(models.QuerySet): # define a class PostQuerySet to add queries shared by post views
+    def with_liked(self, user): # define a method with_liked to annotate whether 'user' liked each post, takes user as argument
+        return self.annotate( # annotate posts with 'liked' flag
+            liked=models.Exists( # check for a row of the like table with an indexed lookup, without loading likers of the post
+                Post.likes.through.objects.filter( # filter like table by post and user
+                    post=models.OuterRef('pk'), # match like rows of the annotated post
+                    myuser=user # match like rows of the given user
+                )
+            )
+        )
+
 class Post(models.Model): # define a class Post to represent user's posts
     user = models.ForeignKey( # create a ForeignKey relation between Post and MyUser
         MyUser, # specify related model MyUser as the foreign key reference
         on_delete=models.CASCADE, # delete all posts when the related user is deleted
-        related_name='posts' # assign reverse relation name 'posts' to access user's posts
+        related_name='posts', # assign reverse relation name 'posts' to access user's posts
+        db_index=False # the index on user and creation time below also serves lookups by user
     )
     
     description = models.CharField( # create a CharField to store post description text
@@ -47,4 +69,47 @@ class Post(models.Model): # define a class Post to represent user's posts
         MyUser, # specify MyUser as related model for like relationship
         related_name='post_likes', # assign reverse relation name 'post_likes' to access liked posts from user
         blank=True # allow field to remain empty if no one liked the post
-    )
\ No newline at end of file
+    )
+
+    like_count = models.PositiveIntegerField( # create a PositiveIntegerField to keep number of likes, so feeds do not count likes of every post
+        default=0 # new posts have no likes
+    )
+    fanned_out = models.BooleanField( # create a BooleanField to record whether the post was pushed into followers' timelines
+        default=False # posts that were not pushed, like posts of accounts with huge follower counts, are pulled when feeds are read
+    )
+
+    objects = PostQuerySet.as_manager() # use PostQuerySet methods on Post.objects and related managers
+
+    class Meta: # define an inner Meta class to set indexes of posts
+        indexes = [ # list indexes used by feed reads
+            models.Index(fields=['user', '-created_at', '-id'], name='post_user_time_idx'), # read a user's posts newest first from a cursor as a range scan
+            models.Index( # create an index to pull posts that were not pushed into timelines, newest first per user
+                fields=['user', '-created_at', '-id'], # index posts by author and creation time
+                condition=models.Q(fanned_out=False), # only index posts that were not pushed, which keeps the index small
+                name='post_pulled_idx' # name the index
+            ),
+        ]
+
+class TimelineEntry(models.Model): # define a class TimelineEntry to store post ids pushed into a user's home timeline
+    user = models.ForeignKey( # create a ForeignKey to the user who owns the timeline
+        MyUser, # specify MyUser as related model
+        on_delete=models.CASCADE, # delete timeline entries when the user is deleted
+        related_name='timeline', # assign reverse relation name 'timeline' to access a user's timeline
+        db_index=False # the index on user and creation time below also serves lookups by user
+    )
+
+    post = models.ForeignKey( # create a ForeignKey to the post pushed into the timeline
+        Post, # specify Post as related model
+        on_delete=models.CASCADE, # delete timeline entries when the post is deleted
+        related_name='timeline_entries' # assign reverse relation name 'timeline_entries' to access entries of a post
+    )
+
+    created_at = models.DateTimeField() # create a DateTimeField holding a copy of post's creation time, so timelines are ordered without reading posts
+
+    class Meta: # define an inner Meta class to set constraints and indexes of timeline entries
+        constraints = [ # list constraints of timeline entries
+            models.UniqueConstraint(fields=['user', 'post'], name='timeline_user_post_unique'), # a post is pushed into a timeline at most once
+        ]
+        indexes = [ # list indexes used by feed reads
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_time_idx'), # read a timeline newest first as a range scan
+        ]
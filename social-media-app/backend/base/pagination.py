@@ -0,0 +1,62 @@
+import base64 # import base64 to make cursors opaque and safe in URLs
+from datetime import datetime # import datetime to read creation times back from cursors
+
+from django.db.models import Q # import Q to build the keyset condition
+from rest_framework.pagination import BasePagination # import BasePagination to plug keyset pagination into DRF responses
+from rest_framework.response import Response # import Response class to send paginated responses
+from rest_framework.utils.urls import replace_query_param # import replace_query_param to build the link of the next page
+
+# create a function that encodes the (created_at, id) position of the last row of a page as an opaque cursor
+def encode_cursor(position):
+    created_at, row_id = position
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{row_id}'.encode()).decode()
+
+# create a function that decodes a cursor back to a (created_at, id) position, it raises ValueError when the cursor is malformed
+def decode_cursor(cursor):
+    created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(created_at), int(row_id)
+
+# create a function that keeps rows of 'queryset' ordered after 'position' when read newest first, and orders them that way
+# 'created_at__lte' bounds the scan of the (created_at, id) index, the second condition skips rows of the same time already shown
+def before(queryset, position, id_field='id'):
+    if position is not None:
+        created_at, row_id = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{id_field}__lt': row_id}),
+            created_at__lte=created_at
+        )
+    return queryset.order_by('-created_at', f'-{id_field}')
+
+# create a class that paginates rows newest first by their (created_at, id) position instead of page numbers
+# a page is read by seeking its position in an index, so deep pages cost the same as the first one and new rows never shift pages
+class KeysetPagination(BasePagination):
+    page_size = 10 # number of rows per page
+    cursor_query_param = 'cursor' # query parameter holding the cursor of the page
+
+    # return the position the requested page starts after, or None for the first page, it raises ValueError for malformed cursors
+    def get_position(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        return decode_cursor(cursor) if cursor else None
+
+    # return the rows of the page from 'rows', which holds up to 'page_size' + 1 rows after the position so the next page can be detected
+    # every row is either a (created_at, id) position or a model instance with 'created_at' field
+    def paginate_rows(self, rows, request):
+        rows = list(rows)
+        self.request = request
+        self.next_position = None
+
+        if len(rows) > self.page_size:
+            last = rows[self.page_size - 1]
+            self.next_position = last if isinstance(last, tuple) else (last.created_at, last.pk)
+        return rows[:self.page_size]
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
@@ -24,33 +24,26 @@ class UserRegisterSerializer(serializers.ModelSerializer): # define a class User
         return user # return created user instance
 
 class MyUserProfileSerializer(serializers.ModelSerializer): # define a class MyUserProfileSerializer to serialize user profile data
-    follower_count = serializers.SerializerMethodField() # define SerializerMethodField to compute number of followers dynamically
-    following_count = serializers.SerializerMethodField() # define SerializerMethodField to compute number of users the person follows dynamically
-
     class Meta: # define an inner Meta class to specify model and fields
         model = MyUser # assign MyUser model to be serialized
-        fields = ['username', 'bio', 'profile_image', 'follower_count', 'following_count'] # specify fields to include in serialized data
-
-    def get_follower_count(self, obj): # define a method get_follower_count to return number of followers, takes obj (user instance) as argument
-        return obj.followers.count() # return count of related follower users
-
-    def get_following_count(self, obj): # define a method get_following_count to return number of users being followed, takes obj (user instance) as argument
-        return obj.following.count() # return count of related following users
+        fields = ['username', 'bio', 'profile_image', 'follower_count', 'following_count'] # specify fields to include in serialized data, counts are read from counter columns kept by toggleFollow
+        read_only_fields = ['follower_count', 'following_count'] # counts are only changed by following and unfollowing users
 
 class PostSerializer(serializers.ModelSerializer): # define a class PostSerializer to serialize post data
-    username = serializers.SerializerMethodField() # define SerializerMethodField to get username of post creator
-    like_count = serializers.SerializerMethodField() # define SerializerMethodField to calculate number of likes for post
+    username = serializers.CharField( # create a CharField to get username of post creator
+        source='user_id', # read username from post's foreign key since username is the primary key of users, so the user is not fetched
+        read_only=True # set read_only to True since author is not changed through this serializer
+    )
+    liked = serializers.SerializerMethodField() # define SerializerMethodField to tell whether the current user liked the post
     formatted_date = serializers.SerializerMethodField() # define SerializerMethodField to format post creation date
 
     class Meta: # define an inner Meta class to specify model and fields
         model = Post # assign Post model to be serialized
-        fields = ['id', 'username', 'description', 'formatted_date', 'likes', 'like_count'] # specify fields to include in serialized data
-
-    def get_username(self, obj): # define a method get_username to retrieve post creator's username, takes obj (post instance) as argument
-        return obj.user.username # return username of user associated with the post
+        fields = ['id', 'username', 'description', 'formatted_date', 'liked', 'like_count'] # specify fields to include in serialized data
+        read_only_fields = ['like_count'] # like count is only changed by liking and unliking posts
 
-    def get_like_count(self, obj): # define a method get_like_count to calculate number of likes, takes obj (post instance) as argument
-        return obj.likes.count() # return count of users who liked the post
+    def get_liked(self, obj): # define a method get_liked to return whether the current user liked the post, takes obj (post instance) as argument
+        return getattr(obj, 'liked', False) # return 'liked' annotation added by Post.objects.with_liked, posts without it were just created and have no likes
 
     def get_formatted_date(self, obj): # define a method get_formatted_date to format creation date, takes obj (post instance) as argument
         return obj.created_at.strftime("%d %b %y") # return formatted date string in 'day month year' format
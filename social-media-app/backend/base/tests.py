@@ -1,3 +1,251 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import timeline
+from .counters import reconcile, toggle_row
+from .models import Follow, MyUser, Post, TimelineEntry
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.alice = MyUser.objects.create_user(username='alice', password='pass')
+        self.bob = MyUser.objects.create_user(username='bob', password='pass')
+        self.carol = MyUser.objects.create_user(username='carol', password='pass')
+        self.client = APIClient()
+
+    def login(self, user):
+        self.client.force_authenticate(user)
+
+    def post(self, user, description):
+        self.login(user)
+        return self.client.post('/api/create_post/', {'description': description}, format='json').data
+
+    def feed(self, user, url='/api/get_posts/'):
+        self.login(user)
+        return self.client.get(url).data
+
+    def test_posts_are_pushed_to_followers(self):
+        self.bob.followers.add(self.alice)
+        self.post(self.bob, 'hello')
+        self.post(self.carol, 'not followed')
+
+        self.assertEqual([post['description'] for post in self.feed(self.alice)['results']], ['hello'])
+        self.assertEqual([post['description'] for post in self.feed(self.bob)['results']], ['hello'])
+        self.assertTrue(Post.objects.get(description='hello').fanned_out)
+
+    def test_follow_backfills_and_unfollow_removes_posts(self):
+        self.post(self.bob, 'first')
+        self.post(self.bob, 'second')
+
+        self.login(self.alice)
+        self.assertTrue(self.client.post('/api/toggle_follow/', {'username': 'bob'}, format='json').data['now_following'])
+        self.assertEqual([post['description'] for post in self.feed(self.alice)['results']], ['second', 'first'])
+
+        self.login(self.alice)
+        self.assertFalse(self.client.post('/api/toggle_follow/', {'username': 'bob'}, format='json').data['now_following'])
+        self.assertEqual(self.feed(self.alice)['results'], [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.alice).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_accounts_over_fanout_limit_are_pulled(self):
+        for user in (self.alice, self.carol):
+            self.login(user)
+            self.client.post('/api/toggle_follow/', {'username': 'bob'}, format='json')
+        self.post(self.bob, 'famous')
+        self.post(self.alice, 'own')
+
+        self.assertFalse(TimelineEntry.objects.filter(post__description='famous').exists())
+        self.assertEqual([post['description'] for post in self.feed(self.alice)['results']], ['own', 'famous'])
+        self.assertEqual([post['description'] for post in self.feed(self.bob)['results']], ['famous'])
+
+    @override_settings(TIMELINE_MAX_LENGTH=3, TIMELINE_TRIM_INTERVAL=1)
+    def test_timelines_are_trimmed(self):
+        self.bob.followers.add(self.alice)
+        for i in range(5):
+            self.post(self.bob, f'post {i}')
+
+        self.assertEqual(TimelineEntry.objects.filter(user=self.alice).count(), 3)
+        self.assertEqual([post['description'] for post in self.feed(self.alice)['results']], ['post 4', 'post 3', 'post 2'])
+
+    @override_settings(TIMELINE_MAX_LENGTH=3, TIMELINE_TRIM_INTERVAL=1000)
+    def test_periodic_trim_bounds_timelines_missed_by_posts(self):
+        self.bob.followers.add(self.alice)
+        for i in range(5):
+            self.post(self.bob, f'post {i}')
+        self.post(self.carol, 'short timeline')
+
+        self.assertEqual(TimelineEntry.objects.filter(user=self.alice).count(), 5) # no post id was a multiple of the interval
+        self.assertEqual(timeline.trim_all(), 2)
+        self.assertEqual([post['description'] for post in self.feed(self.alice)['results']], ['post 4', 'post 3', 'post 2'])
+        self.assertEqual(TimelineEntry.objects.filter(user=self.carol).count(), 1)
+        self.assertEqual(timeline.trim_all(), 0)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.alice = MyUser.objects.create_user(username='alice', password='pass')
+        self.bob = MyUser.objects.create_user(username='bob', password='pass')
+        self.bob.followers.add(self.alice)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+        # posts share creation times in pairs, so pages have to break ties by id
+        now = timezone.now()
+        self.posts = Post.objects.bulk_create([Post(user=self.bob, description=f'post {i}') for i in range(25)])
+        for i, post in enumerate(self.posts):
+            post.created_at = now - timedelta(minutes=i // 2)
+        Post.objects.bulk_update(self.posts, ['created_at'])
+        for post in self.posts:
+            timeline.push_post(post)
+
+    def collect(self, url):
+        descriptions, pages = [], 0
+        while url:
+            data = self.client.get(url).data
+            descriptions += [post['description'] for post in data['results']]
+            url, pages = data['next'], pages + 1
+        return descriptions, pages
+
+    def expected(self):
+        return [post.description for post in sorted(self.posts, key=lambda post: (post.created_at, post.id), reverse=True)]
+
+    def test_feed_pages_follow_cursors(self):
+        descriptions, pages = self.collect('/api/get_posts/')
+        self.assertEqual(descriptions, self.expected())
+        self.assertEqual(pages, 3)
+
+    def test_user_posts_pages_follow_cursors(self):
+        descriptions, pages = self.collect('/api/posts/bob/')
+        self.assertEqual(descriptions, self.expected())
+        self.assertEqual(pages, 3)
+
+    def test_new_posts_do_not_shift_pages(self):
+        first = self.client.get('/api/get_posts/').data
+        self.client.force_authenticate(self.bob)
+        self.client.post('/api/create_post/', {'description': 'new'}, format='json')
+        self.client.force_authenticate(self.alice)
+
+        second = self.client.get(first['next']).data
+        self.assertEqual([post['description'] for post in second['results']], self.expected()[10:20])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/get_posts/?cursor=bad').data, {'error': 'invalid cursor'})
+        self.assertEqual(self.client.get('/api/posts/bob/?cursor=bad').data, {'error': 'invalid cursor'})
+
+
+class LikeTests(TestCase):
+    def setUp(self):
+        self.alice = MyUser.objects.create_user(username='alice', password='pass')
+        self.bob = MyUser.objects.create_user(username='bob', password='pass')
+        self.bob.followers.add(self.alice)
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+        self.post_ids = [self.client.post('/api/create_post/', {'description': f'post {i}'}, format='json').data['id'] for i in range(5)]
+
+    def toggle(self, user, post_id):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/toggleLike/', {'id': post_id}, format='json').data
+
+    def test_feed_reports_like_count_and_liked_without_likers(self):
+        self.toggle(self.alice, self.post_ids[0])
+        self.toggle(self.bob, self.post_ids[0])
+        self.toggle(self.bob, self.post_ids[1])
+
+        self.client.force_authenticate(self.alice)
+        with self.assertNumQueries(5): # current user, three feed sources and the posts of the page
+            posts = {post['id']: post for post in self.client.get('/api/get_posts/').data['results']}
+
+        self.assertEqual((posts[self.post_ids[0]]['like_count'], posts[self.post_ids[0]]['liked']), (2, True))
+        self.assertEqual((posts[self.post_ids[1]]['like_count'], posts[self.post_ids[1]]['liked']), (1, False))
+        self.assertNotIn('likes', posts[self.post_ids[0]])
+
+        posts = self.client.get('/api/posts/bob/').data['results']
+        self.assertEqual([post['liked'] for post in posts], [False, False, False, False, True])
+
+    def test_toggle_like_returns_state_and_count(self):
+        self.assertEqual(self.toggle(self.alice, self.post_ids[0]), {'now_liked': True, 'like_count': 1})
+        self.assertEqual(self.toggle(self.bob, self.post_ids[0]), {'now_liked': True, 'like_count': 2})
+
+        with self.assertNumQueries(5): # delete, update and read of the counter inside a transaction
+            self.assertEqual(self.toggle(self.alice, self.post_ids[0]), {'now_liked': False, 'like_count': 1})
+        self.assertEqual(Post.objects.get(id=self.post_ids[0]).like_count, 1)
+
+    def test_toggle_like_of_missing_post_changes_nothing(self):
+        self.assertEqual(self.toggle(self.alice, 12345), {'error': 'post does not exist'})
+        self.assertFalse(Post.likes.through.objects.exists())
+
+    def test_conflicting_insert_does_not_count_twice(self):
+        Like = Post.likes.through
+        Like.objects.create(post_id=self.post_ids[0], myuser=self.alice)
+
+        # a concurrent request inserted the row after this one found nothing to delete
+        with mock.patch.object(QuerySet, 'delete', return_value=(0, {})):
+            self.assertEqual(toggle_row(Like, post_id=self.post_ids[0], myuser=self.alice), 0)
+        self.assertEqual(Like.objects.count(), 1)
+
+
+class FollowCounterTests(TestCase):
+    def setUp(self):
+        self.alice = MyUser.objects.create_user(username='alice', password='pass')
+        self.bob = MyUser.objects.create_user(username='bob', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def profile(self):
+        return self.client.get('/api/user_data/bob/').data
+
+    def test_toggle_follow_updates_counters(self):
+        self.assertEqual(
+            self.client.post('/api/toggle_follow/', {'username': 'bob'}, format='json').data,
+            {'now_following': True, 'follower_count': 1}
+        )
+        profile = self.profile()
+        self.assertEqual((profile['follower_count'], profile['following_count'], profile['following']), (1, 0, True))
+        self.assertEqual(MyUser.objects.get(username='alice').following_count, 1)
+
+        self.client.post('/api/toggle_follow/', {'username': 'bob'}, format='json')
+        profile = self.profile()
+        self.assertEqual((profile['follower_count'], profile['following']), (0, False))
+        self.assertEqual(MyUser.objects.get(username='alice').following_count, 0)
+
+    def test_users_can_not_follow_themselves(self):
+        self.assertEqual(self.client.post('/api/toggle_follow/', {'username': 'alice'}, format='json').data, {'error': 'users can not follow themselves'})
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(MyUser.objects.get(username='alice').follower_count, 0)
+
+    def test_follow_of_themselves_does_not_change_own_posts_in_feed(self):
+        Post.objects.create(user=self.alice, description='pulled') # never pushed, so it is read from the posts of alice
+        self.alice.followers.add(self.alice) # follow made before follows of themselves were refused
+        self.assertEqual([post['description'] for post in self.client.get('/api/get_posts/').data['results']], ['pulled'])
+
+        self.client.post('/api/create_post/', {'description': 'pushed'}, format='json')
+        timeline.unfollow(self.alice, self.alice)
+        self.assertEqual([post['description'] for post in self.client.get('/api/get_posts/').data['results']], ['pushed', 'pulled'])
+
+    def test_toggle_follow_of_missing_user_changes_nothing(self):
+        self.assertEqual(self.client.post('/api/toggle_follow/', {'username': 'nobody'}, format='json').data, {'error': 'users does not exist'})
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(MyUser.objects.get(username='alice').following_count, 0)
+
+    def test_profile_does_not_count_followers(self):
+        with self.assertNumQueries(2): # target user and the follow row of current user
+            self.profile()
+
+    def test_reconcile_repairs_drift(self):
+        self.bob.followers.add(self.alice)
+        post = Post.objects.create(user=self.bob, description='post')
+        post.likes.add(self.alice)
+        MyUser.objects.filter(username='alice').update(follower_count=5)
+
+        self.assertEqual(reconcile(), (2, 1))
+        self.assertEqual(
+            list(MyUser.objects.order_by('username').values_list('follower_count', 'following_count')),
+            [(0, 1), (1, 0)]
+        )
+        self.assertEqual(Post.objects.get(id=post.id).like_count, 1)
+        self.assertEqual(reconcile(), (0, 0))
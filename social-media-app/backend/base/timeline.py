@@ -0,0 +1,90 @@
+import heapq # import heapq to merge pushed and pulled posts newest first
+from itertools import islice # import islice to cut merged posts to the page
+
+from django.conf import settings # import settings to read timeline limits
+from django.db.models import Count, F, Window # import F and Window to rank timeline entries per user and Count to find timelines that grew too long
+from django.db.models.functions import RowNumber # import RowNumber to find entries beyond the length of a timeline
+
+from .models import Follow, Post, TimelineEntry # import models used by timelines
+from .pagination import before # import before to read feeds from a keyset position
+
+BATCH_SIZE = 500 # number of users written or trimmed per query
+
+# create a function that returns a timeline setting, read on every call so tests can change it
+def setting(name, default):
+    return getattr(settings, name, default)
+
+# create a function that deletes the oldest entries of the timelines of 'user_ids' so that each keeps 'TIMELINE_MAX_LENGTH' entries
+def trim(user_ids):
+    max_length = setting('TIMELINE_MAX_LENGTH', 800)
+    user_ids = list(user_ids)
+
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        overflow = TimelineEntry.objects.filter( # rank entries of every user newest first and keep those ranked past the limit
+            user__in=user_ids[start:start + BATCH_SIZE]
+        ).annotate(
+            rank=Window(RowNumber(), partition_by=[F('user')], order_by=[F('created_at').desc(), F('post').desc()])
+        ).filter(rank__gt=max_length).values_list('id', flat=True)
+
+        ids = list(overflow)
+        if ids:
+            TimelineEntry.objects.filter(id__in=ids).delete()
+
+# create a function that trims every timeline holding more than 'TIMELINE_MAX_LENGTH' entries and returns the number of timelines trimmed
+# it is run as a periodic job by 'trim_timelines' command and bounds every timeline, whichever posts it received
+def trim_all():
+    user_ids = list(
+        TimelineEntry.objects.values('user').annotate(length=Count('id')).filter(length__gt=setting('TIMELINE_MAX_LENGTH', 800)).values_list('user', flat=True)
+    )
+    trim(user_ids)
+    return len(user_ids)
+
+# create a function that pushes a new post into the timelines of its author and the author's followers
+# accounts with more than 'TIMELINE_FANOUT_LIMIT' followers are not pushed, their posts are pulled by 'home_feed' instead, so one post never writes millions of rows
+# timelines it wrote to are trimmed when the id of the post is a multiple of 'TIMELINE_TRIM_INTERVAL', a fraction of the cost of trimming on every post
+# post ids are shared by all authors, so a follower is trimmed about every 'TIMELINE_TRIM_INTERVAL' posts they receive on average only, a follower of a few accounts
+# may receive many posts in a row of which none triggers a trim, so timelines are only kept near 'TIMELINE_MAX_LENGTH' here and bounded for sure by 'trim_all'
+def push_post(post):
+    if post.user.follower_count > setting('TIMELINE_FANOUT_LIMIT', 5000):
+        return
+
+    user_ids = [post.user_id, *Follow.objects.filter(from_myuser=post.user_id).values_list('to_myuser', flat=True)]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, created_at=post.created_at) for user_id in user_ids],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    Post.objects.filter(id=post.id).update(fanned_out=True)
+    post.fanned_out = True
+
+    if post.id % setting('TIMELINE_TRIM_INTERVAL', 20) == 0:
+        trim(user_ids)
+
+# create a function that copies the latest pushed posts of 'author' into the timeline of 'follower', called when 'follower' starts following 'author'
+# both users can be given as instances or usernames
+def follow(follower, author):
+    posts = Post.objects.filter(user=author, fanned_out=True).order_by('-created_at', '-id')[:setting('TIMELINE_MAX_LENGTH', 800)]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=getattr(follower, 'pk', follower), post_id=post_id, created_at=created_at) for post_id, created_at in posts.values_list('id', 'created_at')],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim([getattr(follower, 'pk', follower)])
+
+# create a function that removes posts of 'author' from the timeline of 'follower', called when 'follower' stops following 'author'
+# own posts of 'follower' stay in the timeline, even when a follow of themselves made before follows were refused is removed
+def unfollow(follower, author):
+    TimelineEntry.objects.filter(user=follower, post__user=author).exclude(post__user=follower).delete()
+
+# create a function that returns up to 'limit' (created_at, post id) rows of the home feed of 'user' after 'position', newest first
+# pushed posts come from the user's timeline and pulled posts from followed accounts whose posts were not pushed
+# every source is read from 'position' through its index and limited on its own, then the sources are merged, so a page costs the same however deep it is
+def home_feed(user, position=None, limit=10):
+    followed = Follow.objects.filter(to_myuser=user).exclude(from_myuser=user).values('from_myuser') # own posts are read by the last source, even for a follow of themselves
+
+    sources = [
+        before(TimelineEntry.objects.filter(user=user).values_list('created_at', 'post_id'), position, 'post_id'),
+        before(Post.objects.filter(fanned_out=False, user__in=followed).values_list('created_at', 'id'), position),
+        before(Post.objects.filter(fanned_out=False, user=user).values_list('created_at', 'id'), position),
+    ]
+    return list(islice(heapq.merge(*(source[:limit] for source in sources), reverse=True), limit))
@@ -1,11 +1,15 @@
 from rest_framework.decorators import api_view, permission_classes # import decorators to define API view types and set permission rules
 from rest_framework.permissions import IsAuthenticated # import IsAuthenticated class to restrict access to authenticated users
 from rest_framework.response import Response # import Response class to send JSON responses back to client
+from django.db import transaction # import transaction to toggle follows and likes atomically
+from django.db.models import F # import F to update counters in the database
 
-from rest_framework.pagination import PageNumberPagination # import PageNumberPagination to handle paginated API responses
+from .pagination import KeysetPagination, before # import KeysetPagination and before to paginate posts newest first by cursor
 
-from .models import MyUser, Post # import MyUser and Post models from current app’s models to use in API operations
+from .models import MyUser, Post, Follow # import MyUser, Post and Follow models from current app’s models to use in API operations
 from .serializers import MyUserProfileSerializer, UserRegisterSerializer, PostSerializer, UserSerializer # import serializers to convert model instances to and from JSON
+from .counters import toggle_row # import toggle_row to insert or delete follow and like rows
+from . import timeline # import timeline module to push posts into followers' home timelines and read home feeds
 
 from rest_framework_simplejwt.views import ( # import JWT view classes for token management
     TokenObtainPairView, # import TokenObtainPairView to obtain access and refresh tokens
@@ -141,10 +145,10 @@ def get_user_profile_data(request, pk): # define a function get_user_profile_dat
             many=False # specify many=False since we are serializing a single object
         )
 
-        following = False # initialize variable following as False to track if current user follows the target user
-
-        if request.user in user.followers.all(): # check if authenticated user exists in target user's followers list
-            following = True # set following to True if current user follows the target user
+        following = Follow.objects.filter( # check if current user follows the target user with an indexed lookup of a single follow row
+            from_myuser=user, # match follows of the target user
+            to_myuser=request.user # match follows by the authenticated user
+        ).exists() # return True when the follow row exists
 
         return Response({ # return response dictionary containing serialized user data and follow status
             **serializer.data, # unpack serialized data into response dictionary
@@ -159,24 +163,38 @@ def get_user_profile_data(request, pk): # define a function get_user_profile_dat
 @permission_classes([IsAuthenticated]) # define decorator to ensure only authenticated users can access this view
 def toggleFollow(request): # define a function toggleFollow to follow or unfollow another user, takes request as argument
     try: # start try block to handle errors during follow toggle process
-        try: # nested try block to fetch user instances from database
-            my_user = MyUser.objects.get( # call get method to fetch current logged-in user's MyUser instance
-                username=request.user.username # pass current authenticated username as argument
-            )
-            user_to_follow = MyUser.objects.get( # call get method to fetch target user's MyUser instance
-                username=request.data['username'] # pass target username extracted from request data as argument
-            )
+        username = request.data['username'] # get target username from request data
+
+        if username == request.user.pk: # check if current user tries to follow themselves, their own posts are already in their home timeline
+            return Response({'error': 'users can not follow themselves'}) # return error response when user targets themselves
+
+        try: # nested try block to roll back the toggle when target user does not exist
+            with transaction.atomic(): # change the follow row and both counters in one transaction
+                change = toggle_row( # delete the follow row or insert it when missing, guarded by its unique constraint
+                    Follow, # pass through model of follows
+                    from_myuser_id=username, # match follows of the target user
+                    to_myuser_id=request.user.pk # match follows by the authenticated user
+                )
+
+                if not MyUser.objects.filter(username=username).update(follower_count=F('follower_count') + change): # apply change to follower counter of target user, no row is updated when the user does not exist
+                    raise MyUser.DoesNotExist # roll back the toggle when target user does not exist
+
+                MyUser.objects.filter(username=request.user.pk).update(following_count=F('following_count') + change) # apply change to following counter of current user
+
+                if change > 0: # check if current user just started following the target user
+                    timeline.follow(request.user, username) # copy target user's latest posts into current user's home timeline
+                elif change < 0: # check if current user just stopped following the target user
+                    timeline.unfollow(request.user, username) # remove target user's posts from current user's home timeline
+
+                follower_count = MyUser.objects.values_list('follower_count', flat=True).get(username=username) # read updated follower count of target user
         
-        except MyUser.DoesNotExist: # handle case when one or both users do not exist
+        except MyUser.DoesNotExist: # handle case when target user does not exist
             return Response({'error': 'users does not exist'}) # return error response when user not found
-        
-        if my_user in user_to_follow.followers.all(): # check if current user already exists in target user's followers list
-            user_to_follow.followers.remove(my_user) # call remove method to unfollow user by removing relationship
-            return Response({'now_following': False}) # return response indicating that user is no longer following
-        
-        else: # if user is not already following the target user
-            user_to_follow.followers.add(my_user) # call add method to follow user by adding relationship
-            return Response({'now_following': True}) # return response indicating that user is now following
+
+        return Response({ # return response with new follow state and follower count
+            'now_following': change >= 0, # the follow row exists unless it was just deleted
+            'follower_count': follower_count # include updated follower count of target user
+        })
     
     except: # handle any unexpected exception during follow toggle process
         return Response({'error': 'error following user'}) # return error response indicating an error occurred while following
@@ -196,55 +214,54 @@ def get_users_posts(request, pk): # define a function get_users_posts to retriev
     except MyUser.DoesNotExist: # handle case when either user does not exist
         return Response({'error': 'user does not exist'}) # return error response if user retrieval fails
     
-    posts = user.posts.all().order_by('-created_at') # fetch all posts of target user and order them by creation date descending
+    paginator = KeysetPagination() # create KeysetPagination instance to handle paginated response
 
-    serializer = PostSerializer( # create PostSerializer instance to convert posts queryset to JSON
-        posts, # pass posts queryset as argument
-        many=True # specify many=True since multiple posts are serialized
-    )
+    paginator.page_size = 10 # set number of posts per page to 10
 
-    data = [] # initialize empty list to store serialized posts with additional like status
+    try: # start try block to read position of requested page
+        position = paginator.get_position(request) # decode cursor of requested page, None for first page
+    
+    except ValueError: # handle malformed cursor
+        return Response({'error': 'invalid cursor'}) # return error response if cursor cannot be decoded
 
-    for post in serializer.data: # iterate through each serialized post dictionary
-        new_post = {} # initialize empty dictionary to hold updated post data
+    result_page = paginator.paginate_rows( # read one post more than a page after position to know whether a next page exists
+        before(user.posts.with_liked(my_user), position)[:paginator.page_size + 1], # pass target user's posts newest first with whether current user liked them
+        request # pass request object to build link of next page
+    )
 
-        if my_user.username in post['likes']: # check if current user's username exists in post's likes list
-            new_post = {**post, 'liked': True} # create new post dictionary including 'liked':True
-        
-        else: # if user has not liked the post
-            new_post = {**post, 'liked': False} # create new post dictionary including 'liked':False
-        
-        data.append(new_post) # append updated post dictionary to data list
+    serializer = PostSerializer( # create PostSerializer instance to convert posts of the page to JSON
+        result_page, # pass posts of the page
+        many=True # specify many=True since multiple posts are serialized
+    )
 
-    return Response(data) # return response containing list of posts with like status
+    return paginator.get_paginated_response(serializer.data) # return paginated response containing posts with like status and link of next page
     
 @api_view(['POST']) # define decorator to allow only POST requests for this view
 @permission_classes([IsAuthenticated]) # define decorator to ensure only authenticated users can access this view
 def toggleLike(request): # define a function toggleLike to like or unlike a post, takes request as argument
     try: # start try block to handle errors during like toggle process
-        try: # nested try block to fetch post instance from database
-            post = Post.objects.get( # call get method on Post model to fetch target post
-                id=request.data['id'] # pass post ID from request data to identify the post
-            )
+        post_id = request.data['id'] # get post ID from request data
+
+        try: # nested try block to roll back the toggle when post does not exist
+            with transaction.atomic(): # change the like row and the like counter in one transaction
+                change = toggle_row( # delete the like row or insert it when missing, guarded by its unique constraint
+                    Post.likes.through, # pass through model of likes
+                    post_id=post_id, # match likes of the post
+                    myuser_id=request.user.pk # match likes by the authenticated user
+                )
+
+                if not Post.objects.filter(id=post_id).update(like_count=F('like_count') + change): # apply change to like counter, no row is updated when the post does not exist
+                    raise Post.DoesNotExist # roll back the toggle when post does not exist
+
+                like_count = Post.objects.values_list('like_count', flat=True).get(id=post_id) # read updated like count of the post
         
         except Post.DoesNotExist: # handle case when post does not exist
             return Response({'error': 'post does not exist'}) # return error response if post not found
-        
-        try: # nested try block to fetch current authenticated user
-            user = MyUser.objects.get( # call get method on MyUser model to fetch current user
-                username=request.user.username # pass authenticated user's username as argument
-            )
-        
-        except MyUser.DoesNotExist: # handle case when authenticated user does not exist in database
-            return Response({'error': 'user does not exist'}) # return error response if user not found
-        
-        if user in post.likes.all(): # check if current user has already liked the post
-            post.likes.remove(user) # remove user from post's likes to unlike
-            return Response({'now_liked': False}) # return response indicating post is now unliked
-        
-        else: # if user has not liked the post yet
-            post.likes.add(user) # add user to post's likes to like the post
-            return Response({'now_liked': True}) # return response indicating post is now liked
+
+        return Response({ # return response with new like state and like count
+            'now_liked': change >= 0, # the like row exists unless it was just deleted
+            'like_count': like_count # include updated like count of the post
+        })
     
     except: # handle any unexpected errors during like toggle process
         return Response({'error': 'failed to like post'}) # return error response indicating failure to like/unlike post
@@ -268,6 +285,8 @@ def create_post(request): # define a function create_post to create a new post,
             description=data['description'] # assign post description from request data
         )
 
+        timeline.push_post(post) # push new post into home timelines of the author and their followers
+
         serializer = PostSerializer( # create PostSerializer instance to convert newly created post to JSON
             post, # pass newly created post instance as argument
             many=False # specify many=False since a single post is being serialized
@@ -280,7 +299,7 @@ def create_post(request): # define a function create_post to create a new post,
 
 @api_view(['GET']) # define decorator to allow only GET requests for this view
 @permission_classes([IsAuthenticated]) # define decorator to ensure only authenticated users can access this view
-def get_posts(request): # define a function get_posts to retrieve paginated posts with like status, takes request as argument
+def get_posts(request): # define a function get_posts to retrieve paginated home feed posts with like status, takes request as argument
     try: # start try block to handle errors safely
         my_user = MyUser.objects.get( # call get method to fetch current authenticated user's MyUser instance
             username=request.user.username # pass authenticated user's username as argument
@@ -289,36 +308,30 @@ def get_posts(request): # define a function get_posts to retrieve paginated post
     except MyUser.DoesNotExist: # handle case when authenticated user does not exist in database
         return Response({'error': 'user does not exist'}) # return error response if user not found
 
-    posts = Post.objects.all().order_by('-created_at') # fetch all posts from database and order by creation date descending
-
-    paginator = PageNumberPagination() # create PageNumberPagination instance to handle paginated response
+    paginator = KeysetPagination() # create KeysetPagination instance to handle paginated response
     
     paginator.page_size = 10 # set number of posts per page to 10
 
-    result_page = paginator.paginate_queryset( # paginate posts queryset based on request page number
-        posts, # pass complete posts queryset
-        request # pass request object to extract pagination parameters
+    try: # start try block to read position of requested page
+        position = paginator.get_position(request) # decode cursor of requested page, None for first page
+    
+    except ValueError: # handle malformed cursor
+        return Response({'error': 'invalid cursor'}) # return error response if cursor cannot be decoded
+
+    result_page = paginator.paginate_rows( # read one post more than a page after position to know whether a next page exists
+        timeline.home_feed(my_user, position, paginator.page_size + 1), # pass (created_at, post id) rows of posts by current user and the users they follow, newest first
+        request # pass request object to build link of next page
     )
+
+    post_ids = [post_id for _, post_id in result_page] # collect ids of posts on the requested page
+    posts = Post.objects.with_liked(my_user).in_bulk(post_ids) # fetch posts of the page with whether current user liked them in one query
     
     serializer = PostSerializer( # create PostSerializer instance to convert paginated posts to JSON
-        result_page, # pass paginated queryset
+        [posts[post_id] for post_id in post_ids if post_id in posts], # pass posts of the page in feed order
         many=True # specify many=True since multiple posts are serialized
     )
 
-    data = [] # initialize empty list to store serialized posts with like status
-
-    for post in serializer.data: # iterate through each serialized post dictionary
-        new_post = {} # initialize empty dictionary to hold updated post data
-
-        if my_user.username in post['likes']: # check if current user's username exists in post's likes list
-            new_post = {**post, 'liked': True} # include 'liked':True if user liked the post
-        
-        else: # if user has not liked the post
-            new_post = {**post, 'liked': False} # include 'liked':False
-        
-        data.append(new_post) # append updated post dictionary to data list
-
-    return paginator.get_paginated_response(data) # return paginated response containing updated posts list
+    return paginator.get_paginated_response(serializer.data) # return paginated response containing posts with like status
 
 @api_view(['GET']) # define decorator to allow only GET requests for this view
 @permission_classes([IsAuthenticated]) # define decorator to ensure only authenticated users can access this view
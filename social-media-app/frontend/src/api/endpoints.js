@@ -78,9 +78,9 @@ export const toggleFollow = async (username) => { // define a function to follow
     return response.data // return updated follow status
 }
 
-export const get_users_posts = async (username) => { // define a function to fetch posts of a specific user
-    const response = await api.get(`/posts/${username}/`) // GET request to `/posts/{username}/` endpoint to fetch user's posts
-    return response.data // return posts data
+export const get_users_posts = async (username, cursor) => { // define a function to fetch a page of posts of a specific user
+    const response = await api.get(`/posts/${username}/`, { params: { cursor: cursor } }) // GET request to `/posts/{username}/` endpoint, cursor of the page is omitted for the first page
+    return response.data // return posts of the page and link of the next page
 }
 
 export const toggleLike = async (id) => { // define a function to like/unlike a post
@@ -99,9 +99,13 @@ export const create_post = async (description) => { // define a function to crea
     return response.data // return created post data
 }
 
-export const get_posts = async (num) => { // define a function to fetch paginated posts
-    const response = await api.get(`/get_posts/?page=${num}`) // GET request to `/get_posts/?page={num}` endpoint to get posts for a specific page
-    return response.data // return posts for that page
+export const get_posts = async (cursor) => { // define a function to fetch paginated posts
+    const response = await api.get('/get_posts/', { params: { cursor: cursor } }) // GET request to `/get_posts/` endpoint, cursor of the page is omitted for the first page
+    return response.data // return posts of the page and link of the next page
+}
+
+export const get_next_cursor = (next) => { // define a function to read the cursor of the next page from its link
+    return next ? new URL(next).searchParams.get('cursor') : null // return cursor query parameter, or null when there is no next page
 }
 
 export const search_users = async (search) => { // define a function to search users by query
@@ -11,13 +11,8 @@ const Post = ({ id, username, description, formatted_date, liked, like_count })
     const handleToggleLike = async () => { // define a function to toggle like status for the post
         const data = await toggleLike(id); // call API to toggle like for the given post ID
         
-        if (data.now_liked) { // if post is now liked after API call
-            setClientLiked(true) // update state to liked
-            setClientLikeCount(clientLikeCount + 1) // increment like count
-        } else { // if post is now unliked
-            setClientLiked(false) // update state to unliked
-            setClientLikeCount(clientLikeCount - 1) // decrement like count
-        }
+        setClientLiked(data.now_liked) // update state to liked or unliked as returned by API
+        setClientLikeCount(data.like_count) // update like count as returned by API
     }
 
     return (
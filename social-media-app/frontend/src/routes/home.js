@@ -1,17 +1,17 @@
 import { Heading, VStack, Text, Flex, Button } from "@chakra-ui/react"; // import Chakra UI components for layout, text, and buttons
 import { useEffect, useState } from "react"; // import React hooks for state and side effects
-import { get_posts } from "../api/endpoints"; // import API function to fetch paginated posts
+import { get_posts, get_next_cursor } from "../api/endpoints"; // import API functions to fetch paginated posts and read cursor of next page
 import Post from "../components/post"; // import Post component to render individual posts
 
 const Home = () => { // define a functional component for the home page displaying posts
     const [posts, setPosts] = useState([]) // state to store fetched posts
     const [loading, setLoading] = useState(true) // state to track loading status
-    const [nextPage, setNextPage] = useState(1) // state to track next page number for pagination
+    const [nextPage, setNextPage] = useState(undefined) // state to track cursor of next page, undefined for first page and null when there are no more pages
 
     const fetchData = async () => { // define a function to fetch posts from API
         const data = await get_posts(nextPage) // call API to get posts for current page
         setPosts([...posts, ...data.results]) // append fetched posts to existing posts
-        setNextPage(data.next ? nextPage + 1 : null) // update next page or set to null if no more pages
+        setNextPage(get_next_cursor(data.next)) // update cursor of next page or set to null if no more pages
     }
 
     useEffect(() => { // run effect once when component mounts
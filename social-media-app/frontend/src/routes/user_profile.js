@@ -1,6 +1,6 @@
 import { Text, VStack, Flex, Box, Heading, HStack, Image, Button, Spacer } from "@chakra-ui/react"; // import Chakra UI components for layout, text, images, buttons, and spacing
 import { useState, useEffect } from "react"; // import React hooks for state management and side effects
-import { get_user_profile_data, get_users_posts, toggleFollow } from "../api/endpoints"; // import API functions for fetching user data, posts, and toggling follow
+import { get_user_profile_data, get_users_posts, get_next_cursor, toggleFollow } from "../api/endpoints"; // import API functions for fetching user data, posts, and toggling follow
 import { SERVER_URL } from "../constants/constants"; // import server URL constant
 import Post from "../components/post"; // import Post component to display individual posts
 
@@ -16,13 +16,8 @@ const UserDetails = ({ username }) => { // define a functional component to disp
     const handleToggleFollow = async () => { // define function to handle follow/unfollow
         const data = await toggleFollow(username); // call API to toggle follow status
         
-        if (data.now_following) { // if user is now following
-            setFollowerCount(followerCount + 1) // increment follower count
-            setFollowing(true) // update following state
-        } else { // if user is now unfollowed
-            setFollowerCount(followerCount - 1) // decrement follower count
-            setFollowing(false) // update following state
-        }
+        setFollowerCount(data.follower_count) // update follower count as returned by API
+        setFollowing(data.now_following) // update following state as returned by API
     }
 
     useEffect(() => { // useEffect to fetch user profile data on component mount
@@ -82,19 +77,21 @@ const UserDetails = ({ username }) => { // define a functional component to disp
 const UserPosts = ({ username }) => { // define functional component to display user's posts
     const [posts, setPosts] = useState([]) // state to store posts
     const [loading, setLoading] = useState(true) // state to track loading
+    const [nextPage, setNextPage] = useState(undefined) // state to track cursor of next page, undefined for first page and null when there are no more pages
 
-    useEffect(() => { // fetch posts on component mount
-        const fetchPosts = async () => {
-            try {
-                const posts = await get_users_posts(username) // call API to get user's posts
-                setPosts(posts) // update posts state
-            } catch { // handle error
-                alert('error getting users posts') // show alert on error
-            } finally {
-                setLoading(false) // set loading to false after fetching
-            }
+    const fetchPosts = async () => {
+        try {
+            const data = await get_users_posts(username, nextPage) // call API to get a page of user's posts
+            setPosts([...posts, ...data.results]) // append fetched posts to existing posts
+            setNextPage(get_next_cursor(data.next)) // update cursor of next page or set to null if no more pages
+        } catch { // handle error
+            alert('error getting users posts') // show alert on error
+        } finally {
+            setLoading(false) // set loading to false after fetching
         }
+    }
 
+    useEffect(() => { // fetch posts on component mount
         fetchPosts() // call fetchPosts function
     }, []) // empty dependency array ensures it runs only once
 
@@ -115,6 +112,11 @@ const UserPosts = ({ username }) => { // define functional component to display
                     />
                 })
             }
+            {
+                nextPage && !loading && ( // show "Load More" button if there is a next page and not loading
+                    <Button onClick={fetchPosts} w='100%'>Load More</Button> // button to load more posts
+                )
+            }
         </Flex>
     )
 }